@@ -110,6 +110,10 @@ doc_events = {
         "on_trash": "whatsapp_notifications.whatsapp_notifications.events.handle_on_trash",
         "on_change": "whatsapp_notifications.whatsapp_notifications.events.handle_on_change",
         "on_update_after_submit": "whatsapp_notifications.whatsapp_notifications.approval.handle_workflow_state_change",
+    },
+    "Workflow": {
+        "on_update": "whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_approval_template.whatsapp_approval_template.clear_active_workflow_cache",
+        "on_trash": "whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_approval_template.whatsapp_approval_template.clear_active_workflow_cache",
     }
 }
 
@@ -124,7 +128,9 @@ scheduler_events = {
         ],
         # Retry failed messages every 5 minutes
         "*/5 * * * *": [
-            "whatsapp_notifications.whatsapp_notifications.tasks.retry_failed_messages"
+            "whatsapp_notifications.whatsapp_notifications.tasks.retry_failed_messages",
+            # Expire overdue approval requests (single indexed UPDATE)
+            "whatsapp_notifications.whatsapp_notifications.approval.expire_old_requests"
         ],
         # Check auto reports every 15 minutes
         "*/15 * * * *": [
@@ -180,12 +186,12 @@ scheduler_events = {
 # Request Events
 # ----------------
 # before_request = ["whatsapp_notifications.utils.before_request"]
-# after_request = ["whatsapp_notifications.utils.after_request"]
+after_request = ["whatsapp_notifications.whatsapp_notifications.utils.flush_debug_log"]
 
 # Job Events
 # ----------
 # before_job = ["whatsapp_notifications.utils.before_job"]
-# after_job = ["whatsapp_notifications.utils.after_job"]
+after_job = ["whatsapp_notifications.whatsapp_notifications.utils.flush_debug_log"]
 
 # User Data Protection
 # --------------------
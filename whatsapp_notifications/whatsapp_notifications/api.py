@@ -14,27 +14,17 @@ def make_http_request(url, method="POST", headers=None, data=None):
     Make HTTP request compatible with v13, v14, and v15
     Forces JSON UTF-8 when sending dict payloads.
     """
-    headers = headers or {}
+    from whatsapp_notifications.whatsapp_notifications.utils import prepare_json_body
 
-    # If data is a dict/list, we want JSON
-    is_json = isinstance(data, (dict, list))
+    # Encode a JSON payload once for whichever method ends up sending it
+    headers, data = prepare_json_body(headers, data)
 
     # Method 1: frappe.integrations.utils (v14+)
     try:
         from frappe.integrations.utils import make_post_request, make_get_request
 
         if method.upper() == "POST":
-            if is_json:
-                # Some versions support `json=`
-                try:
-                    return make_post_request(url, headers=headers, json=data)
-                except TypeError:
-                    # fallback: encode manually as UTF-8 JSON string
-                    import json
-                    headers["Content-Type"] = "application/json; charset=utf-8"
-                    return make_post_request(url, headers=headers, data=json.dumps(data, ensure_ascii=False).encode("utf-8"))
-            else:
-                return make_post_request(url, headers=headers, data=data)
+            return make_post_request(url, headers=headers, data=data)
         else:
             return make_get_request(url, headers=headers)
 
@@ -46,16 +36,7 @@ def make_http_request(url, method="POST", headers=None, data=None):
     # Method 2: frappe.make_post_request (v13)
     try:
         if method.upper() == "POST":
-            if is_json:
-                import json
-                headers["Content-Type"] = "application/json; charset=utf-8"
-                return frappe.make_post_request(
-                    url,
-                    headers=headers,
-                    data=json.dumps(data, ensure_ascii=False).encode("utf-8")
-                )
-            else:
-                return frappe.make_post_request(url, headers=headers, data=data)
+            return frappe.make_post_request(url, headers=headers, data=data)
         else:
             return frappe.make_get_request(url, headers=headers)
 
@@ -65,15 +46,24 @@ def make_http_request(url, method="POST", headers=None, data=None):
         pass  # Fall through to next method
 
     # Method 3: requests library (fallback)
-    import requests
+    return make_requests_call(url, method=method, headers=headers, data=data)
+
+
+def make_requests_call(url, method="POST", headers=None, data=None):
+    """
+    Make HTTP request with the requests library only
+
+    Does not touch frappe, so it is safe to call from worker threads.
+    """
+    from whatsapp_notifications.whatsapp_notifications.utils import get_http_session, prepare_json_body
+
+    session = get_http_session()
+    headers, data = prepare_json_body(headers, data)
+
     if method.upper() == "POST":
-        if is_json:
-            headers["Content-Type"] = "application/json; charset=utf-8"
-            response = requests.post(url, headers=headers, json=data, timeout=60)
-        else:
-            response = requests.post(url, headers=headers, data=data, timeout=60)
+        response = session.post(url, headers=headers, data=data, timeout=60)
     else:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = session.get(url, headers=headers, timeout=30)
 
     # Try to get response body for better error messages
     try:
@@ -118,7 +108,7 @@ def send_whatsapp(phone, message, doctype=None, docname=None, queue=True):
         });
     """
     from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log
+    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log, enqueue_message_log
     from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
     
     # Validate inputs
@@ -131,7 +121,7 @@ def send_whatsapp(phone, message, doctype=None, docname=None, queue=True):
     if not settings.get("enabled"):
         return {"success": False, "error": _("WhatsApp notifications are disabled")}
 
-    if not settings.get("api_url") or not settings.get("api_key") or not settings.get("instance_name"):
+    if not settings.get("api_url") or not settings.get("has_api_key") or not settings.get("instance_name"):
         return {"success": False, "error": _("Evolution API not configured")}
 
     # Format phone number (skip for group IDs)
@@ -154,7 +144,7 @@ def send_whatsapp(phone, message, doctype=None, docname=None, queue=True):
     
     # Send immediately or queue based on settings
     if queue and settings.get("queue_enabled"):
-        # Message will be processed by scheduled task
+        enqueue_message_log(log.name)
         return {"success": True, "message": _("Message queued"), "log": log.name}
     else:
         # Send immediately
@@ -163,7 +153,8 @@ def send_whatsapp(phone, message, doctype=None, docname=None, queue=True):
 
 
 def send_whatsapp_notification(phone, message, reference_doctype=None, reference_name=None,
-                               notification_rule=None, recipient_name=None):
+                               notification_rule=None, recipient_name=None, commit=True,
+                               log_name=None):
     """
     Internal function to send WhatsApp notification
     Called by event handlers and scheduled tasks
@@ -175,12 +166,17 @@ def send_whatsapp_notification(phone, message, reference_doctype=None, reference
         reference_name: Source document name
         notification_rule: Triggering rule name
         recipient_name: Recipient display name
+        commit: If False, an immediate send (queue disabled) is deferred and
+            flagged with "send_after_commit" so the caller can run
+            process_message_log once its own transaction is committed. The
+            log itself is never committed here either way.
+        log_name: Pre-allocated WhatsApp Message Log name (optional)
     
     Returns:
         dict: Result with success status
     """
     from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log
+    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log, enqueue_message_log
     from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
     
     settings = get_settings()
@@ -205,12 +201,17 @@ def send_whatsapp_notification(phone, message, reference_doctype=None, reference
         reference_name=reference_name,
         notification_rule=notification_rule,
         recipient_name=recipient_name,
-        formatted_phone=formatted_phone
+        formatted_phone=formatted_phone,
+        name=log_name
     )
     
     # Queue or send immediately based on settings
     if settings.get("queue_enabled"):
+        enqueue_message_log(log.name)
         return {"success": True, "queued": True, "log": log.name}
+    elif not commit:
+        # process_message_log commits, so the caller sends after its own commit
+        return {"success": True, "queued": True, "log": log.name, "send_after_commit": True}
     else:
         return process_message_log(log.name)
 
@@ -225,82 +226,20 @@ def process_message_log(log_name):
     Returns:
         dict: Result with success status
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-    
     try:
-        log = frappe.get_doc("WhatsApp Message Log", log_name)
-        
-        # Only process Pending or Queued messages
-        if log.status not in ("Pending", "Queued"):
-            return {"success": False, "error": "Message already processed", "status": log.status}
-        
-        settings = get_settings()
-        
-        if not settings.get("enabled"):
-            log.mark_failed("WhatsApp notifications disabled")
-            return {"success": False, "error": "Disabled"}
-        
-        # Update status to Sending
-        log.db_set("status", "Sending")
-        frappe.db.commit()
-        
-        # Build API request
-        url = "{}/message/sendText/{}".format(
-            settings.get("api_url"),
-            settings.get("instance_name")
-        )
-        
-        headers = {
-            "Content-Type": "application/json; charset=utf-8",
-            "apikey": settings.get("api_key")
-        }
-        
-        # Build payload - escape for JSON (v13 sandbox compatible)
-        payload = {
-            "number": log.formatted_phone,
-            "text": log.message
-        }
+        prepared = prepare_message_log(log_name)
+        if "result" in prepared:
+            return prepared["result"]
 
-        
         # Make request using compatible method
         try:
-            response = make_http_request(url, method="POST", headers=headers, data=payload)
-            
-            # Extract message ID from response
-            response_id = None
-            if isinstance(response, dict):
-                response_id = response.get("key", {}).get("id") or response.get("messageId")
-            
-            log.mark_sent(response_data=response, response_id=response_id)
-
-            # Add timeline comment to the referenced document
-            if log.reference_doctype and log.reference_name:
-                from whatsapp_notifications.whatsapp_notifications.utils import add_notification_sent_comment
-                add_notification_sent_comment(
-                    log.reference_doctype,
-                    log.reference_name,
-                    log.formatted_phone,
-                    log.recipient_name
-                )
-
-            if settings.get("enable_debug_logging"):
-                frappe.log_error(
-                    "WhatsApp Sent: {} to {}".format(log.name, log.formatted_phone),
-                    "WhatsApp Debug"
-                )
-
-            return {"success": True, "log": log.name, "response_id": response_id}
-            
-        except Exception as e:
-            error_msg = str(e)
-            log.mark_failed(error_msg)
-
-            frappe.log_error(
-                message=f"{log.name} -> {error_msg}",
-                title="WhatsApp Send Failed"
+            response = make_http_request(
+                prepared["url"], method="POST", headers=prepared["headers"], data=prepared["payload"]
             )
+        except Exception as e:
+            return finish_message_log(prepared, error=e)
 
-            return {"success": False, "error": error_msg, "log": log.name}
+        return finish_message_log(prepared, response=response)
     
     except Exception as e:
         frappe.log_error(
@@ -310,6 +249,175 @@ def process_message_log(log_name):
         return {"success": False, "error": str(e)}
 
 
+def process_message_logs(log_names, max_workers=8):
+    """
+    Send several message log entries, running the HTTP calls concurrently
+
+    Loading and status updates stay on the calling thread (one database
+    connection); only the network calls go to a bounded thread pool.
+
+    Args:
+        log_names: WhatsApp Message Log document names
+        max_workers: Maximum number of concurrent HTTP calls
+
+    Returns:
+        dict: Result per log name
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if len(log_names) < 2:
+        return {log_name: process_message_log(log_name) for log_name in log_names}
+
+    results = {}
+    to_send = []
+    for log_name in log_names:
+        try:
+            prepared = prepare_message_log(log_name, commit=False)
+        except Exception as e:
+            frappe.log_error(message=str(e), title="WhatsApp Process Error")
+            results[log_name] = {"success": False, "error": str(e)}
+            continue
+
+        if "result" in prepared:
+            results[log_name] = prepared["result"]
+        else:
+            to_send.append(prepared)
+
+    if not to_send:
+        return results
+
+    # Persist the "Sending" status before going to the network
+    frappe.db.commit()
+
+    def post(prepared):
+        try:
+            return make_requests_call(
+                prepared["url"], method="POST", headers=prepared["headers"], data=prepared["payload"]
+            ), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(to_send))) as executor:
+        responses = list(executor.map(post, to_send))
+
+    for prepared, (response, error) in zip(to_send, responses):
+        try:
+            results[prepared["log"].name] = finish_message_log(prepared, response=response, error=error)
+        except Exception as e:
+            frappe.log_error(message=str(e), title="WhatsApp Process Error")
+            results[prepared["log"].name] = {"success": False, "error": str(e)}
+
+    return results
+
+
+def prepare_message_log(log_name, commit=True):
+    """
+    Load a message log and mark it as Sending
+
+    Args:
+        log_name: WhatsApp Message Log document name
+        commit: Commit the Sending status right away
+
+    Returns:
+        dict: Either {"result": ...} when there is nothing to send, or the
+            log, settings and the url/headers/payload of the API request
+    """
+    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_api_key, get_settings
+    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import claim_message_log
+
+    log = frappe.get_doc("WhatsApp Message Log", log_name)
+    
+    # Only process Pending or Queued messages
+    if log.status not in ("Pending", "Queued"):
+        return {"result": {"success": False, "error": "Message already processed", "status": log.status}}
+    
+    settings = get_settings()
+    
+    if not settings.get("enabled"):
+        log.mark_failed("WhatsApp notifications disabled")
+        return {"result": {"success": False, "error": "Disabled"}}
+    
+    # Claim the log (Sending) so no other worker sends it as well
+    claimed_at = claim_message_log(log.name)
+    if not claimed_at:
+        return {"result": {"success": False, "error": "Message already processed"}}
+    log.status = "Sending"
+    log.modified = claimed_at
+    if commit:
+        frappe.db.commit()
+    
+    # Build API request
+    url = "{}/message/sendText/{}".format(
+        settings.get("api_url"),
+        settings.get("instance_name")
+    )
+    
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "apikey": get_api_key()
+    }
+    
+    # Build payload - escape for JSON (v13 sandbox compatible)
+    payload = {
+        "number": log.formatted_phone,
+        "text": log.message
+    }
+
+    return {"log": log, "settings": settings, "url": url, "headers": headers, "payload": payload}
+
+
+def finish_message_log(prepared, response=None, error=None):
+    """
+    Record the outcome of a send prepared by prepare_message_log
+
+    Args:
+        prepared: Dict returned by prepare_message_log
+        response: API response (on success)
+        error: Exception raised by the API call (on failure)
+
+    Returns:
+        dict: Result with success status
+    """
+    log = prepared["log"]
+    settings = prepared["settings"]
+
+    if error is not None:
+        error_msg = str(error)
+        log.mark_failed(error_msg)
+
+        frappe.log_error(
+            message=f"{log.name} -> {error_msg}",
+            title="WhatsApp Send Failed"
+        )
+
+        return {"success": False, "error": error_msg, "log": log.name}
+
+    # Extract message ID from response
+    response_id = None
+    if isinstance(response, dict):
+        response_id = response.get("key", {}).get("id") or response.get("messageId")
+    
+    log.mark_sent(response_data=response, response_id=response_id)
+
+    # Add timeline comment to the referenced document
+    if log.reference_doctype and log.reference_name:
+        from whatsapp_notifications.whatsapp_notifications.utils import add_notification_sent_comment
+        add_notification_sent_comment(
+            log.reference_doctype,
+            log.reference_name,
+            log.formatted_phone,
+            log.recipient_name
+        )
+
+    if settings.get("enable_debug_logging"):
+        frappe.log_error(
+            "WhatsApp Sent: {} to {}".format(log.name, log.formatted_phone),
+            "WhatsApp Debug"
+        )
+
+    return {"success": True, "log": log.name, "response_id": response_id}
+
+
 @frappe.whitelist()
 def send_test_message(phone, message=None):
     """
@@ -361,14 +469,14 @@ def fetch_whatsapp_groups():
     Returns:
         dict: List of groups with id, subject, size or error message
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
+    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_api_key, get_settings
 
     settings = get_settings()
 
     if not settings.get("enabled"):
         return {"success": False, "error": _("WhatsApp notifications are disabled")}
 
-    if not settings.get("api_url") or not settings.get("api_key") or not settings.get("instance_name"):
+    if not settings.get("api_url") or not settings.get("has_api_key") or not settings.get("instance_name"):
         return {"success": False, "error": _("Evolution API not configured")}
 
     url = "{}/group/fetchAllGroups/{}?getParticipants=false".format(
@@ -376,7 +484,7 @@ def fetch_whatsapp_groups():
         settings.get("instance_name")
     )
 
-    headers = {"apikey": settings.get("api_key")}
+    headers = {"apikey": get_api_key()}
 
     try:
         response = make_http_request(url, method="GET", headers=headers)
@@ -432,7 +540,7 @@ def send_whatsapp_media(phone, doctype=None, docname=None, file_url=None,
         dict: Result with success status
     """
     from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log
+    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log, enqueue_message_log
     from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
 
     # Validate inputs
@@ -448,7 +556,7 @@ def send_whatsapp_media(phone, doctype=None, docname=None, file_url=None,
     if not settings.get("enabled"):
         return {"success": False, "error": _("WhatsApp notifications are disabled")}
 
-    if not settings.get("api_url") or not settings.get("api_key") or not settings.get("instance_name"):
+    if not settings.get("api_url") or not settings.get("has_api_key") or not settings.get("instance_name"):
         return {"success": False, "error": _("Evolution API not configured")}
 
     # Format phone number (skip for group IDs)
@@ -528,6 +636,7 @@ def send_whatsapp_media(phone, doctype=None, docname=None, file_url=None,
 
     # Send immediately or queue based on settings
     if queue and settings.get("queue_enabled"):
+        enqueue_message_log(log.name, message_type)
         return {"success": True, "message": _("Media message queued"), "log": log.name}
     else:
         result = process_media_message_log(log.name)
@@ -544,7 +653,8 @@ def process_media_message_log(log_name):
     Returns:
         dict: Result with success status
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
+    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_api_key, get_settings
+    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import claim_message_log
 
     try:
         log = frappe.get_doc("WhatsApp Message Log", log_name)
@@ -559,8 +669,12 @@ def process_media_message_log(log_name):
             log.mark_failed("WhatsApp notifications disabled")
             return {"success": False, "error": "Disabled"}
 
-        # Update status to Sending
-        log.db_set("status", "Sending")
+        # Claim the log (Sending) so no other worker sends it as well
+        claimed_at = claim_message_log(log_name)
+        if not claimed_at:
+            return {"success": False, "error": "Message already processed"}
+        log.status = "Sending"
+        log.modified = claimed_at
         frappe.db.commit()
 
         # Get stored media data
@@ -589,7 +703,7 @@ def process_media_message_log(log_name):
 
         headers = {
             "Content-Type": "application/json; charset=utf-8",
-            "apikey": settings.get("api_key")
+            "apikey": get_api_key()
         }
 
         # Build payload for Evolution API v2.3
@@ -1104,12 +1218,13 @@ def clear_all_message_logs():
         return {"success": False, "error": "Permission denied"}
 
     try:
+        from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import truncate_message_logs
+
         # Get count before deletion
         count = frappe.db.count("WhatsApp Message Log")
 
         # Delete all records
-        frappe.db.delete("WhatsApp Message Log")
-        frappe.db.commit()
+        truncate_message_logs()
 
         return {"success": True, "count": count}
     except Exception as e:
@@ -2,12 +2,63 @@
 WhatsApp Notifications - Approval Logic
 Handles sending approval requests and processing responses
 """
+import inspect
+import re
+from functools import lru_cache
+
 import frappe
 from frappe import _
-from frappe.utils import now_datetime
-
-
-def send_approval_request(doctype, docname, template_name, phone=None, enqueue=True):
+from frappe.model.workflow import apply_workflow
+from frappe.utils import get_datetime, now_datetime
+
+from whatsapp_notifications.whatsapp_notifications.api import process_message_logs, send_whatsapp_notification
+from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
+from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_approval_request.whatsapp_approval_request import (
+    cancel_pending_requests_for_document,
+    get_option_from_snapshot,
+    insert_approval_requests,
+)
+from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_approval_template.whatsapp_approval_template import (
+    get_active_doctypes,
+    get_template_for_workflow_state,
+    get_templates_for_event,
+)
+from whatsapp_notifications.whatsapp_notifications.utils import (
+    add_approval_response_comment,
+    add_whatsapp_comments,
+    flush_debug_log,
+    format_phone_number,
+    get_approval_sent_comment,
+    log_debug,
+    reserve_series_names,
+)
+
+# Field types that execute_field_update writes with db_set instead of a full save
+DIRECT_UPDATE_FIELDTYPES = frozenset((
+    "Data", "Small Text", "Int", "Float", "Currency", "Check", "Select", "Date", "Datetime"
+))
+
+# Document fields tried, in order, for the approval recipient's display name
+RECIPIENT_NAME_FIELDS = (
+    "full_name",
+    "customer_name",
+    "contact_name",
+    "lead_name",
+    "employee_name",
+    "supplier_name",
+    "name1",
+    "first_name"
+)
+
+# Option labels containing any of these (as substrings) mark a request Rejected
+REJECT_KEYWORDS_RE = re.compile("reject|deny|decline|refuse|no|cancel", re.IGNORECASE)
+
+# Every byte except 0-9, used with bytes.translate to keep only digits
+_NON_DIGIT_BYTES = bytes(c for c in range(256) if not 48 <= c <= 57)
+
+
+def send_approval_request(doctype, docname, template_name, phone=None, enqueue=True,
+                          skip_condition_check=False):
     """
     Send an approval request via WhatsApp
 
@@ -17,49 +68,136 @@ def send_approval_request(doctype, docname, template_name, phone=None, enqueue=T
         template_name: WhatsApp Approval Template name
         phone: Override phone number (optional, uses template's recipients if not provided)
         enqueue: If True, send via background job for faster response
+        skip_condition_check: Caller already evaluated the template condition
 
     Returns:
         dict: Result with success status and approval request name
     """
     if enqueue:
         # Queue for background processing
-        frappe.enqueue(
+        enqueue_approval_job(
             "whatsapp_notifications.whatsapp_notifications.approval._send_approval_request_background",
-            queue="short",
+            job_id=f"wa_approval:{doctype}:{docname}:{template_name}:{phone or ''}",
             doctype=doctype,
             docname=docname,
             template_name=template_name,
-            phone=phone
+            phone=phone,
+            skip_condition_check=skip_condition_check
         )
         return {"success": True, "message": _("Approval request queued for sending")}
 
-    return _send_approval_request_impl(doctype, docname, template_name, phone)
+    return _send_approval_request_impl(
+        doctype, docname, template_name, phone, skip_condition_check=skip_condition_check
+    )
+
+
+def enqueue_approval_job(method, job_id, **kwargs):
+    """
+    Enqueue an approval send job, dropping duplicates of a job still queued
+
+    A single save often fires several document events for the same
+    document and template. The queue defaults to "short" and can be moved
+    to a dedicated worker with the whatsapp_approval_queue site config key.
+
+    Args:
+        method: Dotted path of the job function
+        job_id: Identifier used to detect duplicate jobs
+        **kwargs: Job arguments
+    """
+    queue = frappe.conf.get("whatsapp_approval_queue") or "short"
+
+    if _enqueue_supports_deduplicate():
+        frappe.enqueue(method, queue=queue, job_id=job_id, deduplicate=True, **kwargs)
+    else:
+        frappe.enqueue(method, queue=queue, job_name=job_id, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def _enqueue_supports_deduplicate():
+    """frappe.enqueue only accepts job_id/deduplicate on newer versions"""
+    return "deduplicate" in inspect.signature(frappe.enqueue).parameters
 
 
-def _send_approval_request_background(doctype, docname, template_name, phone=None):
+def _send_approval_request_background(doctype, docname, template_name, phone=None,
+                                      skip_condition_check=False):
     """Background job wrapper for send_approval_request"""
     try:
-        result = _send_approval_request_impl(doctype, docname, template_name, phone)
+        result = _send_approval_request_impl(
+            doctype, docname, template_name, phone, skip_condition_check=skip_condition_check
+        )
         if not result.get("success"):
             frappe.log_error(
-                "Background approval request failed: {}".format(result.get("error")),
+                f"Background approval request failed: {result.get('error')}",
                 "WhatsApp Approval Background Error"
             )
     except Exception as e:
         frappe.log_error(
-            "Background approval request error: {}".format(str(e)),
+            f"Background approval request error: {e}",
             "WhatsApp Approval Background Error"
         )
 
+    flush_debug_log()
+
 
-def _send_approval_request_impl(doctype, docname, template_name, phone=None):
+def _send_approval_requests_batch(doctype, docname, template_names, phone=None,
+                                  skip_condition_check=False):
     """
-    Internal implementation of send_approval_request
+    Background job sending approval requests for several templates of one document
+
+    Args:
+        doctype: Document type
+        docname: Document name
+        template_names: List of WhatsApp Approval Template names
+        phone: Override phone number (optional)
+        skip_condition_check: Caller already evaluated the template conditions
+    """
+    try:
+        # Drop disabled templates in one query and load the document once
+        enabled_templates = set(frappe.get_all(
+            "WhatsApp Approval Template",
+            filters={"name": ["in", template_names], "enabled": 1},
+            pluck="name"
+        ))
+        doc = frappe.get_doc(doctype, docname)
+    except Exception as e:
+        frappe.log_error(
+            f"Background approval request error: {e}",
+            "WhatsApp Approval Background Error"
+        )
+        return
+
+    for template_name in template_names:
+        if template_name not in enabled_templates:
+            continue
+
+        try:
+            result = _send_approval_request_impl(
+                doctype, docname, template_name, phone, doc=doc,
+                skip_condition_check=skip_condition_check
+            )
+            if not result.get("success"):
+                frappe.log_error(
+                    f"Background approval request failed: {result.get('error')}",
+                    "WhatsApp Approval Background Error"
+                )
+        except Exception as e:
+            frappe.log_error(
+                f"Background approval request error: {e}",
+                "WhatsApp Approval Background Error"
+            )
+
+    flush_debug_log()
+
+
+def _send_approval_request_impl(doctype, docname, template_name, phone=None, doc=None,
+                                skip_condition_check=False):
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-    from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
-    from whatsapp_notifications.whatsapp_notifications.api import send_whatsapp_notification
+    Internal implementation of send_approval_request
 
+    Args:
+        doc: Already loaded document (optional, loaded from doctype/docname if not given)
+        skip_condition_check: Caller already evaluated the template condition
+    """
     try:
         # Get settings
         settings = get_settings()
@@ -67,15 +205,16 @@ def _send_approval_request_impl(doctype, docname, template_name, phone=None):
             return {"success": False, "error": _("WhatsApp notifications are disabled")}
 
         # Get template
-        template = frappe.get_doc("WhatsApp Approval Template", template_name)
+        template = frappe.get_cached_doc("WhatsApp Approval Template", template_name)
         if not template.enabled:
             return {"success": False, "error": _("Approval template is disabled")}
 
         # Get document
-        doc = frappe.get_doc(doctype, docname)
+        if doc is None:
+            doc = frappe.get_doc(doctype, docname)
 
-        # Check condition if set
-        if not template.check_condition(doc):
+        # Check condition if set (event hooks evaluate it before enqueuing)
+        if not skip_condition_check and not template.check_condition(doc):
             return {"success": False, "error": _("Condition not met for this document")}
 
         # Get recipients
@@ -90,76 +229,113 @@ def _send_approval_request_impl(doctype, docname, template_name, phone=None):
 
         # Cancel previous pending requests if not allowed
         if not template.allow_multiple_pending:
-            from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_approval_request.whatsapp_approval_request import cancel_pending_requests_for_document
             cancel_pending_requests_for_document(doctype, docname, "New approval request sent")
 
         # Render message
         message = template.render_message(doc)
 
-        # Create approval requests for all recipients
-        approval_requests = []
+        # Snapshot options so responses resolve without reloading the template
+        options_snapshot = template.get_options_snapshot()
+
+        # Build approval request rows for all valid recipients
+        recipient_name = get_recipient_name_from_document(doc)
+        request_rows = []
         for recipient_phone in recipients:
             # Format phone number
             formatted_phone = format_phone_number(recipient_phone)
             if not formatted_phone:
                 frappe.log_error(
-                    "Invalid phone number skipped: {}".format(recipient_phone),
+                    f"Invalid phone number skipped: {recipient_phone}",
                     "WhatsApp Approval Warning"
                 )
                 continue
 
-            # Create approval request record
-            approval_request = frappe.get_doc({
-                "doctype": "WhatsApp Approval Request",
+            request_rows.append({
                 "status": "Pending",
                 "approval_template": template_name,
                 "reference_doctype": doctype,
                 "reference_name": docname,
                 "recipient_phone": recipient_phone,
                 "formatted_phone": formatted_phone,
-                "recipient_name": get_recipient_name_from_document(doc)
+                "recipient_name": recipient_name,
+                "options_snapshot": options_snapshot
             })
-            approval_request.insert(ignore_permissions=True)
-            approval_requests.append(approval_request)
 
-            # Send WhatsApp message
-            result = send_whatsapp_notification(
-                phone=recipient_phone,
-                message=message,
-                reference_doctype="WhatsApp Approval Request",
-                reference_name=approval_request.name,
-                notification_rule=None,
-                recipient_name=approval_request.recipient_name
-            )
-
-            if result.get("success") or result.get("queued"):
-                # Update approval request with message log reference
-                if result.get("log"):
-                    approval_request.db_set("message_log", result.get("log"))
-
-                # Add timeline comment to the original document
-                from whatsapp_notifications.whatsapp_notifications.utils import add_approval_sent_comment
-                add_approval_sent_comment(
-                    doctype,
-                    docname,
-                    recipient_phone,
-                    template_name,
-                    approval_request.recipient_name
+        # Create approval request records (bulk insert when fanning out), with
+        # the message log names allocated up front so the link is written once
+        approval_requests = []
+        if request_rows:
+            for row, log_name in zip(request_rows, reserve_series_names("WAMSG-", len(request_rows))):
+                row["message_log"] = log_name
+
+            approval_requests = insert_approval_requests(request_rows, template.expiry_hours)
+
+        sent_comments = []
+        send_after_commit = []
+        for i, approval_request in enumerate(approval_requests):
+            # Isolate each recipient so one failure doesn't roll back the others
+            savepoint = f"wa_recipient_{i}"
+            frappe.db.savepoint(savepoint)
+
+            try:
+                # Send WhatsApp message (committed once below)
+                result = send_whatsapp_notification(
+                    phone=approval_request.recipient_phone,
+                    message=message,
+                    reference_doctype="WhatsApp Approval Request",
+                    reference_name=approval_request.name,
+                    notification_rule=None,
+                    recipient_name=approval_request.recipient_name,
+                    commit=False,
+                    log_name=approval_request.message_log
                 )
-            else:
-                # Failed to send
-                approval_request.mark_error(result.get("error", "Failed to send message"))
+
+                if result.get("success") or result.get("queued"):
+                    if result.get("send_after_commit"):
+                        send_after_commit.append((approval_request, result.get("log")))
+
+                    sent_comments.append(get_approval_sent_comment(
+                        approval_request.recipient_phone,
+                        template_name,
+                        approval_request.recipient_name
+                    ))
+                else:
+                    # Failed to send; no log was created under the reserved name
+                    if not result.get("log"):
+                        approval_request.db_set("message_log", None, update_modified=False)
+                    approval_request.mark_error(result.get("error", "Failed to send message"))
+
+                frappe.db.release_savepoint(savepoint)
+
+            except Exception as e:
+                frappe.db.rollback(save_point=savepoint)
+                approval_request.db_set("message_log", None, update_modified=False)
+                approval_request.mark_error(str(e))
+
+        # Add timeline comments to the original document
+        add_whatsapp_comments(doctype, docname, sent_comments)
 
         frappe.db.commit()
 
+        # Immediate sends (queue disabled) go out only after the rows are
+        # committed; the HTTP calls for several recipients run concurrently
+        if send_after_commit:
+            results = process_message_logs([log_name for _ar, log_name in send_after_commit])
+            failed = False
+            for approval_request, log_name in send_after_commit:
+                result = results.get(log_name) or {}
+                if not result.get("success"):
+                    approval_request.mark_error(result.get("error", "Failed to send message"))
+                    failed = True
+            if failed:
+                frappe.db.commit()
+
         if not approval_requests:
             return {"success": False, "error": _("No valid recipients found")}
 
         if settings.get("enable_debug_logging"):
-            frappe.log_error(
-                "Approval requests sent: {} for {} {} to {} recipients".format(
-                    [ar.name for ar in approval_requests], doctype, docname, len(approval_requests)
-                ),
+            log_debug(
+                f"Approval requests sent: {[ar.name for ar in approval_requests]} for {doctype} {docname} to {len(approval_requests)} recipients",
                 "WhatsApp Approval Debug"
             )
 
@@ -171,7 +347,7 @@ def _send_approval_request_impl(doctype, docname, template_name, phone=None):
 
     except Exception as e:
         frappe.log_error(
-            "Error sending approval request for {} {}: {}".format(doctype, docname, str(e)),
+            f"Error sending approval request for {doctype} {docname}: {e}",
             "WhatsApp Approval Error"
         )
         return {"success": False, "error": str(e)}
@@ -190,34 +366,46 @@ def process_approval_response(approval_request_name, option_number, response_tex
     Returns:
         dict: Result with success status
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-
     try:
         settings = get_settings()
 
-        approval_request = frappe.get_doc("WhatsApp Approval Request", approval_request_name)
+        # Validate against a few columns before loading the full document
+        request_row = frappe.db.get_value(
+            "WhatsApp Approval Request",
+            approval_request_name,
+            ["status", "formatted_phone", "expires_at", "approval_template", "options_snapshot"],
+            as_dict=True
+        )
+
+        if not request_row:
+            return {
+                "success": False,
+                "error": _("Approval request {0} not found").format(approval_request_name)
+            }
 
         # Check if already processed (duplicate response)
-        if approval_request.status != "Pending":
+        if request_row.status != "Pending":
             return {
                 "success": False,
                 "already_processed": True,
                 "error": _("This approval request has already been processed (status: {0})").format(
-                    approval_request.status
+                    request_row.status
                 )
             }
 
         # Check expiry
-        if approval_request.is_expired():
-            approval_request.mark_expired()
+        if request_row.expires_at and now_datetime() > get_datetime(request_row.expires_at):
+            # Same write as WhatsAppApprovalRequest.mark_expired (bookkeeping, not an edit)
+            frappe.db.set_value(
+                "WhatsApp Approval Request", approval_request_name, "status", "Expired",
+                update_modified=False
+            )
             return {"success": False, "error": _("This approval request has expired")}
 
         # Verify phone number matches (security check)
-        if not verify_phone_match(approval_request.formatted_phone, response_from):
+        if not verify_phone_match(request_row.formatted_phone, response_from):
             frappe.log_error(
-                "Phone mismatch for approval {}: expected {}, got {}".format(
-                    approval_request_name, approval_request.formatted_phone, response_from
-                ),
+                f"Phone mismatch for approval {approval_request_name}: expected {request_row.formatted_phone}, got {response_from}",
                 "WhatsApp Approval Security"
             )
             return {
@@ -225,9 +413,10 @@ def process_approval_response(approval_request_name, option_number, response_tex
                 "error": _("Response must come from the original recipient's phone number")
             }
 
-        # Get template and option
-        template = frappe.get_doc("WhatsApp Approval Template", approval_request.approval_template)
-        option = template.get_option_by_number(option_number)
+        # Get option from the snapshot stored on the request
+        option = get_option_from_snapshot(
+            request_row.options_snapshot, option_number, request_row.approval_template
+        )
 
         if not option:
             return {
@@ -235,25 +424,24 @@ def process_approval_response(approval_request_name, option_number, response_tex
                 "error": _("Invalid option number: {0}").format(option_number)
             }
 
+        approval_request = frappe.get_doc("WhatsApp Approval Request", approval_request_name)
+
         # Record the response
         approval_request.record_response(option_number, response_text, response_from)
 
-        # Get the referenced document
-        doc = frappe.get_doc(
+        # Execute the action; the result carries the document it acted on
+        action_result = execute_action(
             approval_request.reference_doctype,
-            approval_request.reference_name
+            approval_request.reference_name,
+            option
         )
 
-        # Execute the action
-        action_result = execute_action(doc, option)
-
         if action_result.get("success"):
             # Determine status based on option label
             new_status = determine_status_from_option(option.option_label)
             approval_request.mark_processed(action_result.get("description"), new_status)
 
             # Add timeline comment to the original document
-            from whatsapp_notifications.whatsapp_notifications.utils import add_approval_response_comment
             add_approval_response_comment(
                 approval_request.reference_doctype,
                 approval_request.reference_name,
@@ -262,8 +450,15 @@ def process_approval_response(approval_request_name, option_number, response_tex
                 new_status
             )
 
+            template_flags = frappe.db.get_value(
+                "WhatsApp Approval Template",
+                approval_request.approval_template,
+                ["first_response_wins", "send_confirmation"],
+                as_dict=True
+            ) or frappe._dict()
+
             # If first_response_wins, cancel other pending requests for same document
-            if template.first_response_wins:
+            if template_flags.first_response_wins:
                 cancel_other_pending_requests(
                     approval_request.reference_doctype,
                     approval_request.reference_name,
@@ -272,16 +467,15 @@ def process_approval_response(approval_request_name, option_number, response_tex
                 )
 
             # Send confirmation if enabled
-            if template.send_confirmation:
+            if template_flags.send_confirmation:
+                template = frappe.get_cached_doc("WhatsApp Approval Template", approval_request.approval_template)
                 send_confirmation_message(
-                    template, doc, approval_request, option.option_label, action_result
+                    template, action_result["doc"], approval_request, option.option_label, action_result
                 )
 
             if settings.get("enable_debug_logging"):
-                frappe.log_error(
-                    "Approval processed: {} - Option {} ({})".format(
-                        approval_request_name, option_number, option.option_label
-                    ),
+                log_debug(
+                    f"Approval processed: {approval_request_name} - Option {option_number} ({option.option_label})",
                     "WhatsApp Approval Debug"
                 )
 
@@ -296,9 +490,7 @@ def process_approval_response(approval_request_name, option_number, response_tex
 
     except Exception as e:
         frappe.log_error(
-            "Error processing approval response for {}: {}".format(
-                approval_request_name, str(e)
-            ),
+            f"Error processing approval response for {approval_request_name}: {e}",
             "WhatsApp Approval Error"
         )
         return {"success": False, "error": str(e)}
@@ -314,47 +506,44 @@ def cancel_other_pending_requests(doctype, docname, except_request_name, reason)
         except_request_name: Request name to exclude
         reason: Cancellation reason
     """
-    requests = frappe.get_all(
-        "WhatsApp Approval Request",
-        filters={
-            "status": "Pending",
-            "reference_doctype": doctype,
-            "reference_name": docname,
-            "name": ["!=", except_request_name]
-        }
-    )
+    cancel_pending_requests_for_document(doctype, docname, reason, except_request_name=except_request_name)
 
-    for req in requests:
-        frappe.db.set_value(
-            "WhatsApp Approval Request",
-            req.name,
-            {
-                "status": "Cancelled",
-                "error_message": reason
-            }
-        )
+
+# Approval option action_type -> handler(doc, option)
+ACTION_HANDLERS = {
+    "Workflow Action": lambda doc, option: execute_workflow_action(doc, option.workflow_action),
+    "Update Field": lambda doc, option: execute_field_update(doc, option.field_to_update, option.field_value),
+    "Run Method": lambda doc, option: execute_custom_method(doc, option.method_path),
+}
 
 
-def execute_action(doc, option):
+def execute_action(doctype, docname, option):
     """
     Execute the action defined in an approval option
 
     Args:
-        doc: The document to act on
+        doctype: Document type to act on
+        docname: Document name to act on
         option: WhatsApp Approval Option
 
     Returns:
-        dict: Result with success status and description
+        dict: Result with success status, description and, on success, the
+            updated document as "doc"
     """
+    handler = ACTION_HANDLERS.get(option.action_type)
+    if not handler:
+        return {"success": False, "error": _("Unknown action type: {0}").format(option.action_type)}
+
     try:
-        if option.action_type == "Workflow Action":
-            return execute_workflow_action(doc, option.workflow_action)
-        elif option.action_type == "Update Field":
-            return execute_field_update(doc, option.field_to_update, option.field_value)
-        elif option.action_type == "Run Method":
-            return execute_custom_method(doc, option.method_path)
-        else:
-            return {"success": False, "error": _("Unknown action type: {0}").format(option.action_type)}
+        # The document is about to be mutated, so load it uncached and
+        # row-locked; never use get_cached_doc here or a stale copy ends up
+        # being saved (read-only paths may use the cache).
+        doc = frappe.get_doc(doctype, docname, for_update=True)
+
+        result = handler(doc, option)
+        # Hand the loaded document back so callers don't fetch it again
+        result.setdefault("doc", doc)
+        return result
     except Exception as e:
         return {"success": False, "error": str(e)}
 
@@ -371,14 +560,13 @@ def execute_workflow_action(doc, action_name):
         dict: Result with success status
     """
     try:
-        from frappe.model.workflow import apply_workflow
-
-        # Apply the workflow action
-        apply_workflow(doc, action_name)
+        # Apply the workflow action (returns the saved copy of the document)
+        doc = apply_workflow(doc, action_name)
 
         return {
             "success": True,
-            "description": _("Workflow action '{0}' applied").format(action_name)
+            "description": _("Workflow action '{0}' applied").format(action_name),
+            "doc": doc
         }
     except Exception as e:
         error_msg = str(e)
@@ -410,9 +598,19 @@ def execute_field_update(doc, field_name, field_value):
                 "error": _("Field '{0}' not found on {1}").format(field_name, doc.doctype)
             }
 
-        # Set the field value
-        doc.set(field_name, field_value)
-        doc.save(ignore_permissions=True)
+        df = frappe.get_meta(doc.doctype).get_field(field_name)
+
+        if (
+            df
+            and df.fieldtype in DIRECT_UPDATE_FIELDTYPES
+            and (doc.docstatus == 0 or df.allow_on_submit)
+        ):
+            # Plain scalar: write the single column instead of a full save
+            doc.db_set(field_name, field_value)
+        else:
+            # Set the field value
+            doc.set(field_name, field_value)
+            doc.save(ignore_permissions=True)
 
         return {
             "success": True,
@@ -435,7 +633,7 @@ def execute_custom_method(doc, method_path):
     """
     try:
         # Import and call the method
-        method = frappe.get_attr(method_path)
+        method = _resolve_method(method_path)
         result = method(doc)
 
         return {
@@ -447,48 +645,45 @@ def execute_custom_method(doc, method_path):
         return {"success": False, "error": str(e)}
 
 
+@lru_cache(maxsize=256)
+def _resolve_method(method_path):
+    """Resolve a dotted method path once per worker process"""
+    return frappe.get_attr(method_path)
+
+
 def expire_old_requests():
     """
     Scheduled task to expire old approval requests
-    Should be run hourly via scheduler
+    Runs every 5 minutes via scheduler (hourly on the legacy hook)
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-
     settings = get_settings()
 
-    # Find pending requests that have expired
-    expired_requests = frappe.get_all(
-        "WhatsApp Approval Request",
-        filters={
-            "status": "Pending",
-            "expires_at": ["<", now_datetime()]
-        }
-    )
-
-    count = 0
-    for request in expired_requests:
-        try:
-            frappe.db.set_value(
-                "WhatsApp Approval Request",
-                request.name,
-                "status",
-                "Expired"
-            )
-            count += 1
-        except Exception as e:
-            frappe.log_error(
-                "Error expiring approval request {}: {}".format(request.name, str(e)),
-                "WhatsApp Approval Expiry Error"
-            )
+    # Expire every pending request past its deadline in one statement,
+    # served by the (status, expires_at) index
+    try:
+        now = now_datetime()
+        frappe.db.sql("""
+            UPDATE `tabWhatsApp Approval Request`
+            SET status = 'Expired', modified = %s
+            WHERE status = 'Pending' AND expires_at < %s
+        """, (now, now))
+        count = frappe.db._cursor.rowcount
+    except Exception as e:
+        frappe.log_error(
+            f"Error expiring approval requests: {e}",
+            "WhatsApp Approval Expiry Error"
+        )
+        return
 
     if count > 0:
         frappe.db.commit()
 
         if settings.get("enable_debug_logging"):
-            frappe.log_error(
-                "Expired {} approval requests".format(count),
+            log_debug(
+                f"Expired {count} approval requests",
                 "WhatsApp Approval Expiry"
             )
+            flush_debug_log()
 
 
 def send_confirmation_message(template, doc, approval_request, option_label, action_result):
@@ -502,8 +697,6 @@ def send_confirmation_message(template, doc, approval_request, option_label, act
         option_label: The selected option label
         action_result: Result of the action
     """
-    from whatsapp_notifications.whatsapp_notifications.api import send_whatsapp_notification
-
     try:
         message = template.render_confirmation(doc, option_label, action_result)
 
@@ -518,7 +711,7 @@ def send_confirmation_message(template, doc, approval_request, option_label, act
             )
     except Exception as e:
         frappe.log_error(
-            "Error sending confirmation for {}: {}".format(approval_request.name, str(e)),
+            f"Error sending confirmation for {approval_request.name}: {e}",
             "WhatsApp Approval Confirmation Error"
         )
 
@@ -533,26 +726,55 @@ def get_recipient_name_from_document(doc):
     Returns:
         str: Recipient name or None
     """
-    name_fields = [
-        "full_name",
-        "customer_name",
-        "contact_name",
-        "lead_name",
-        "employee_name",
-        "supplier_name",
-        "name1",
-        "first_name"
-    ]
-
-    for field in name_fields:
-        if hasattr(doc, field):
-            value = getattr(doc, field)
-            if value:
-                return str(value)
+    for field in _recipient_name_fields_for(doc.doctype):
+        value = doc.get(field)
+        if value:
+            return str(value)
 
     return None
 
 
+def _recipient_name_fields_for(doctype):
+    """
+    RECIPIENT_NAME_FIELDS that exist on a doctype, in priority order
+
+    Memoized on frappe.local, so each request or job reads the site's
+    current meta once per doctype.
+    """
+    memo = getattr(frappe.local, "wa_recipient_name_fields", None)
+    if memo is None:
+        memo = frappe.local.wa_recipient_name_fields = {}
+
+    fields = memo.get(doctype)
+    if fields is None:
+        meta = frappe.get_meta(doctype)
+        fields = memo[doctype] = tuple(field for field in RECIPIENT_NAME_FIELDS if meta.has_field(field))
+
+    return fields
+
+
+def _digits(value):
+    """Strip everything but ASCII digits from a phone number"""
+    value = str(value)
+
+    # Webhook senders usually arrive as bare digits already
+    if value.isascii() and value.isdigit():
+        return value
+
+    return value.encode("ascii", "ignore").translate(None, _NON_DIGIT_BYTES).decode("ascii")
+
+
+@lru_cache(maxsize=2048)
+def _format_phone_cached(phone, country_code, local_length, local_prefixes):
+    """
+    Memoized format_phone_number for inbound sender numbers
+
+    The phone settings are part of the cache key, so changing them in
+    Evolution API Settings never returns a stale result.
+    """
+    return format_phone_number(phone, country_code, local_length, local_prefixes)
+
+
 def verify_phone_match(expected_phone, actual_phone):
     """
     Verify that the response phone matches the expected phone
@@ -564,21 +786,35 @@ def verify_phone_match(expected_phone, actual_phone):
     Returns:
         bool: True if phones match
     """
-    from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
-
     if not expected_phone or not actual_phone:
         return False
 
-    # Format the actual phone for comparison
-    formatted_actual = format_phone_number(actual_phone)
+    # Fast path: senders usually arrive already in the canonical form
+    if expected_phone == actual_phone:
+        return True
+
+    clean_expected = _digits(expected_phone)
+    clean_actual = _digits(actual_phone)
+
+    if clean_actual and clean_expected == clean_actual:
+        return True
+
+    # Format the actual phone for comparison (expected is stored pre-formatted)
+    settings = get_settings()
+    formatted_actual = _format_phone_cached(
+        str(actual_phone),
+        settings.get("default_country_code") or "258",
+        settings.get("local_number_length") or 9,
+        tuple(settings.get("local_number_prefixes") or ())
+    )
 
     if not formatted_actual:
-        # Try direct comparison if formatting fails
-        # Clean both numbers for comparison
-        clean_expected = ''.join(filter(str.isdigit, str(expected_phone)))
-        clean_actual = ''.join(filter(str.isdigit, str(actual_phone)))
+        # Try direct comparison of the cleaned numbers if formatting fails
+        # Same subscriber number (handles country code differences)
+        if clean_expected[-9:] == clean_actual[-9:]:
+            return True
 
-        # Check if one ends with the other (handle country code differences)
+        # Check if one ends with the other (shorter numbers)
         return clean_expected.endswith(clean_actual[-9:]) or clean_actual.endswith(clean_expected[-9:])
 
     return expected_phone == formatted_actual
@@ -594,14 +830,7 @@ def determine_status_from_option(option_label):
     Returns:
         str: Status (Approved/Rejected)
     """
-    label_lower = option_label.lower()
-
-    reject_keywords = ["reject", "deny", "decline", "refuse", "no", "cancel"]
-    for keyword in reject_keywords:
-        if keyword in label_lower:
-            return "Rejected"
-
-    return "Approved"
+    return "Rejected" if REJECT_KEYWORDS_RE.search(option_label) else "Approved"
 
 
 def handle_workflow_state_change(doc, method=None):
@@ -613,18 +842,18 @@ def handle_workflow_state_change(doc, method=None):
         doc: Document that changed
         method: Event method name
     """
+    # Cheapest guard first: most saved documents have no workflow state
+    if not getattr(doc, "workflow_state", None):
+        return
+
     try:
-        from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-        from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_approval_template.whatsapp_approval_template import get_template_for_workflow_state
+        if doc.doctype not in get_active_doctypes():
+            return
 
         settings = get_settings()
         if not settings.get("enabled"):
             return
 
-        # Check if document has workflow_state
-        if not hasattr(doc, "workflow_state") or not doc.workflow_state:
-            return
-
         # Look for matching approval template
         template = get_template_for_workflow_state(doc.doctype, doc.workflow_state)
 
@@ -634,17 +863,15 @@ def handle_workflow_state_change(doc, method=None):
         # Check condition
         if not template.check_condition(doc):
             if settings.get("enable_debug_logging"):
-                frappe.log_error(
-                    "Approval condition not met for {} {}".format(doc.doctype, doc.name),
+                log_debug(
+                    f"Approval condition not met for {doc.doctype} {doc.name}",
                     "WhatsApp Approval Condition"
                 )
             return
 
         if settings.get("enable_debug_logging"):
-            frappe.log_error(
-                "Workflow state change detected: {} {} -> {}".format(
-                    doc.doctype, doc.name, doc.workflow_state
-                ),
+            log_debug(
+                f"Workflow state change detected: {doc.doctype} {doc.name} -> {doc.workflow_state}",
                 "WhatsApp Approval Trigger"
             )
 
@@ -653,7 +880,8 @@ def handle_workflow_state_change(doc, method=None):
             doctype=doc.doctype,
             docname=doc.name,
             template_name=template.name,
-            enqueue=True
+            enqueue=True,
+            skip_condition_check=True
         )
 
     except Exception:
@@ -670,8 +898,9 @@ def handle_document_event(doc, event):
         event: Event name (After Insert, On Update, On Submit, On Cancel)
     """
     try:
-        from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-        from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_approval_template.whatsapp_approval_template import get_templates_for_event
+        # Most documents belong to doctypes no approval template targets
+        if doc.doctype not in get_active_doctypes():
+            return
 
         settings = get_settings()
         if not settings.get("enabled"):
@@ -683,44 +912,52 @@ def handle_document_event(doc, event):
         if not templates:
             return
 
+        template_names = []
         for template in templates:
             # Check condition
             if not template.check_condition(doc):
                 if settings.get("enable_debug_logging"):
-                    frappe.log_error(
-                        "Approval condition not met for template {} on {} {}".format(
-                            template.name, doc.doctype, doc.name
-                        ),
+                    log_debug(
+                        f"Approval condition not met for template {template.name} on {doc.doctype} {doc.name}",
                         "WhatsApp Approval Condition"
                     )
                 continue
 
             if settings.get("enable_debug_logging"):
-                frappe.log_error(
-                    "Event trigger: {} on {} {} - template {}".format(
-                        event, doc.doctype, doc.name, template.name
-                    ),
+                log_debug(
+                    f"Event trigger: {event} on {doc.doctype} {doc.name} - template {template.name}",
                     "WhatsApp Approval Trigger"
                 )
 
-            # Send approval request (enqueued for faster response)
+            template_names.append(template.name)
+
+        # Send approval requests (enqueued for faster response)
+        if len(template_names) == 1:
             send_approval_request(
                 doctype=doc.doctype,
                 docname=doc.name,
-                template_name=template.name,
-                enqueue=True
+                template_name=template_names[0],
+                enqueue=True,
+                skip_condition_check=True
+            )
+        elif template_names:
+            # One job for all matching templates instead of one job each
+            enqueue_approval_job(
+                "whatsapp_notifications.whatsapp_notifications.approval._send_approval_requests_batch",
+                job_id=f"wa_approval:{doc.doctype}:{doc.name}:{'|'.join(template_names)}",
+                doctype=doc.doctype,
+                docname=doc.name,
+                template_names=template_names,
+                skip_condition_check=True
             )
 
     except Exception as e:
         # Log error if debug enabled, otherwise fail silently
         try:
-            from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
             settings = get_settings()
             if settings.get("enable_debug_logging"):
-                frappe.log_error(
-                    "handle_document_event error for {} {} ({}): {}".format(
-                        doc.doctype, doc.name, event, str(e)
-                    ),
+                log_debug(
+                    f"handle_document_event error for {doc.doctype} {doc.name} ({event}): {e}",
                     "WhatsApp Approval Event Error"
                 )
         except Exception:
@@ -2,10 +2,54 @@
 Evolution API Settings - Configuration for WhatsApp Integration
 Single DocType for storing Evolution API connection settings
 """
+import re
+import time
+from functools import lru_cache
+from operator import attrgetter
+
 import frappe
 from frappe.model.document import Document
 from frappe import _
 
+# Matches runs of non-digit characters (stripped from the country code)
+_NON_DIGIT_RE = re.compile(r"\D+")
+
+# Endpoint Evolution API posts incoming messages to
+WEBHOOK_ENDPOINT = "/api/method/whatsapp_notifications.whatsapp_notifications.webhook.receive_message"
+
+# Fields copied into the cached settings dict (see get_settings)
+CACHED_SETTINGS_FIELDS = (
+    "enabled",
+    "api_url",
+    "api_key",
+    "instance_name",
+    "default_country_code",
+    "local_number_length",
+    "local_number_prefixes",
+    "owner_number",
+    "timeout_seconds",
+    "max_retries",
+    "retry_delay_minutes",
+    "log_retention_days",
+    "enable_debug_logging",
+    "enable_rate_limiting",
+    "messages_per_minute",
+    "queue_enabled",
+)
+
+# Methods run_settings_job may call in the background
+BACKGROUND_SETTINGS_METHODS = frozenset(("configure_webhook", "test_connection"))
+
+# Gateway errors worth retrying; anything else is returned to the caller as is
+RETRY_STATUS_CODES = frozenset((502, 503, 504))
+
+# Inline retries of a transient failure in make_request (0.5s, then 1s backoff)
+INLINE_RETRIES = 2
+
+# Media DocType row fields copied into the cached settings dict
+MEDIA_DOCTYPE_FIELDS = ("document_type", "phone_field", "default_print_format", "caption_template")
+_get_media_doctype_values = attrgetter(*MEDIA_DOCTYPE_FIELDS)
+
 
 class EvolutionAPISettings(Document):
     """
@@ -19,39 +63,71 @@ class EvolutionAPISettings(Document):
 
     def set_webhook_url(self):
         """Generate and set the webhook URL for Evolution API"""
-        site_url = frappe.utils.get_url()
-        webhook_endpoint = "/api/method/whatsapp_notifications.whatsapp_notifications.webhook.receive_message"
-        self.webhook_url = site_url + webhook_endpoint
+        self.webhook_url = get_webhook_url()
 
     def validate(self):
         """Validate settings before save"""
         self.validate_api_url()
         self.validate_phone_settings()
+
+        # Password fields are masked by the time on_update runs, so note a
+        # newly typed key while it is still in clear text
+        if self.api_key and set(self.api_key) != {"*"}:
+            self.flags.api_key_changed = True
     
     def validate_api_url(self):
         """Ensure API URL is properly formatted"""
         if self.api_url:
-            # Remove trailing slash
-            self.api_url = self.api_url.rstrip("/")
+            url = self.api_url
+
+            # Remove trailing slash (only reassign when there is one)
+            if url.endswith("/"):
+                url = self.api_url = url.rstrip("/")
             
             # Ensure it starts with http:// or https://
-            if not self.api_url.startswith(("http://", "https://")):
+            if not url.startswith("https://") and not url.startswith("http://"):
                 frappe.throw(_("API URL must start with http:// or https://"))
     
     def validate_phone_settings(self):
         """Validate phone number configuration"""
-        if self.default_country_code:
-            # Remove any non-numeric characters
-            self.default_country_code = "".join(
-                c for c in str(self.default_country_code) if c.isdigit()
-            )
+        country_code = self.default_country_code
+        if country_code:
+            # Remove any non-numeric characters (write back only if something was stripped)
+            digits = _NON_DIGIT_RE.sub("", str(country_code))
+            if digits != country_code:
+                self.default_country_code = digits
         
         if self.local_number_length and self.local_number_length < 5:
             frappe.throw(_("Local number length must be at least 5 digits"))
     
     def on_update(self):
-        """Clear cache when settings change"""
-        frappe.cache().delete_key("evolution_api_settings")
+        """Clear cache when a cached setting changes"""
+        if self.cached_settings_changed():
+            frappe.cache().delete_key("evolution_api_settings")
+            frappe.local.wa_evolution_settings = None
+            frappe.local.wa_evolution_api_key = None
+
+    def cached_settings_changed(self):
+        """
+        Check whether a save touched anything get_settings caches
+
+        Status fields (connection_status, webhook_status, last_checked)
+        are not cached, so saving only those keeps the cache.
+
+        Returns:
+            bool: True if the cached settings are stale
+        """
+        before = self.get_doc_before_save()
+        if not before or self.flags.api_key_changed:
+            return True
+
+        if any(self.has_value_changed(fieldname) for fieldname in CACHED_SETTINGS_FIELDS):
+            return True
+
+        def media_rows(doc):
+            return [_get_media_doctype_values(row) for row in doc.get("media_doctypes") or []]
+
+        return media_rows(self) != media_rows(before)
     
     @frappe.whitelist()
     def configure_webhook(self):
@@ -66,9 +142,7 @@ class EvolutionAPISettings(Document):
 
         try:
             # Build webhook URL
-            site_url = frappe.utils.get_url()
-            webhook_endpoint = "/api/method/whatsapp_notifications.whatsapp_notifications.webhook.receive_message"
-            webhook_url = site_url + webhook_endpoint
+            webhook_url = get_webhook_url()
 
             # Build API request
             url = "{}/webhook/set/{}".format(
@@ -99,14 +173,14 @@ class EvolutionAPISettings(Document):
             response = make_request("POST", url, headers=headers, data=payload)
 
             if response:
-                self.db_set("webhook_status", "Configured - {}".format(frappe.utils.now()))
+                self.db_set("webhook_status", "Configured - {}".format(frappe.utils.now()), update_modified=False)
                 return {
                     "success": True,
                     "message": _("Webhook configured successfully in Evolution API"),
                     "webhook_url": webhook_url
                 }
             else:
-                self.db_set("webhook_status", "Error: No response")
+                self.db_set("webhook_status", "Error: No response", update_modified=False)
                 return {
                     "success": False,
                     "message": _("No response from Evolution API")
@@ -114,7 +188,7 @@ class EvolutionAPISettings(Document):
 
         except Exception as e:
             error_msg = str(e)
-            self.db_set("webhook_status", "Error: {}".format(error_msg[:100]))
+            self.db_set("webhook_status", "Error: {}".format(error_msg[:100]), update_modified=False)
 
             frappe.log_error(
                 "Evolution API Webhook Configuration Failed: {}".format(error_msg),
@@ -126,6 +200,22 @@ class EvolutionAPISettings(Document):
                 "message": _("Failed to configure webhook: {}").format(error_msg)
             }
 
+    @frappe.whitelist()
+    def configure_webhook_async(self):
+        """
+        Queue configure_webhook instead of holding a web worker on the API call
+        The outcome is written to webhook_status
+        """
+        return enqueue_settings_job("configure_webhook")
+
+    @frappe.whitelist()
+    def test_connection_async(self):
+        """
+        Queue test_connection instead of holding a web worker on the API call
+        The outcome is written to connection_status / last_checked
+        """
+        return enqueue_settings_job("test_connection")
+
     @frappe.whitelist()
     def get_webhook_status(self):
         """
@@ -197,8 +287,10 @@ class EvolutionAPISettings(Document):
             
             if response and response.get("instance"):
                 state = response.get("instance", {}).get("state", "unknown")
-                self.db_set("connection_status", "Connected ({})".format(state))
-                self.db_set("last_checked", frappe.utils.now())
+                self.db_set({
+                    "connection_status": "Connected ({})".format(state),
+                    "last_checked": frappe.utils.now()
+                }, update_modified=False)
                 
                 return {
                     "success": True,
@@ -206,8 +298,10 @@ class EvolutionAPISettings(Document):
                     "state": state
                 }
             else:
-                self.db_set("connection_status", "Error: Invalid response")
-                self.db_set("last_checked", frappe.utils.now())
+                self.db_set({
+                    "connection_status": "Error: Invalid response",
+                    "last_checked": frappe.utils.now()
+                }, update_modified=False)
                 
                 return {
                     "success": False,
@@ -216,8 +310,10 @@ class EvolutionAPISettings(Document):
                 
         except Exception as e:
             error_msg = str(e)
-            self.db_set("connection_status", "Error: {}".format(error_msg[:100]))
-            self.db_set("last_checked", frappe.utils.now())
+            self.db_set({
+                "connection_status": "Error: {}".format(error_msg[:100]),
+                "last_checked": frappe.utils.now()
+            }, update_modified=False)
             
             frappe.log_error(
                 "Evolution API Connection Test Failed: {}".format(error_msg),
@@ -230,36 +326,64 @@ class EvolutionAPISettings(Document):
             }
 
 
+def get_webhook_url():
+    """
+    Get the webhook URL for this site
+
+    With a full host_name (scheme included) in site config the URL is
+    fixed, so it is built once per process, keyed by host_name; otherwise
+    get_url() decides the scheme/host and is called once per request.
+    """
+    webhook_url = getattr(frappe.local, "wa_webhook_url", None)
+    if not webhook_url:
+        host_name = frappe.conf.get("host_name") or ""
+        if host_name.startswith(("http://", "https://")):
+            webhook_url = _configured_webhook_url(host_name)
+        else:
+            webhook_url = frappe.utils.get_url() + WEBHOOK_ENDPOINT
+        frappe.local.wa_webhook_url = webhook_url
+    return webhook_url
+
+
+@lru_cache(maxsize=32)
+def _configured_webhook_url(host_name):
+    return host_name.rstrip("/") + WEBHOOK_ENDPOINT
+
+
 def get_settings():
     """
     Get cached Evolution API Settings
     Returns dict with all settings for easy access
+
+    Memoized on frappe.local so repeated calls within one request/job skip Redis.
     """
+    settings = getattr(frappe.local, "wa_evolution_settings", None)
+    if settings is not None:
+        return settings
+
     settings = frappe.cache().get_value("evolution_api_settings")
 
     if not settings:
+        from whatsapp_notifications.whatsapp_notifications.utils import split_prefixes
+
         try:
-            doc = frappe.get_single("Evolution API Settings")
+            doc = frappe.get_cached_doc("Evolution API Settings", "Evolution API Settings")
 
             # Get media doctypes child table
-            media_doctypes = []
-            if hasattr(doc, 'media_doctypes') and doc.media_doctypes:
-                for row in doc.media_doctypes:
-                    media_doctypes.append({
-                        "document_type": row.document_type,
-                        "phone_field": row.phone_field,
-                        "default_print_format": row.default_print_format,
-                        "caption_template": row.caption_template
-                    })
+            media_doctypes = [
+                dict(zip(MEDIA_DOCTYPE_FIELDS, _get_media_doctype_values(row)))
+                for row in doc.get("media_doctypes") or []
+            ]
 
             settings = {
                 "enabled": doc.enabled,
                 "api_url": doc.api_url,
-                "api_key": doc.get_password("api_key") if doc.api_key else None,
+                # The key itself is decrypted on demand by get_api_key()
+                "has_api_key": bool(doc.api_key),
                 "instance_name": doc.instance_name,
                 "default_country_code": doc.default_country_code or "258",
                 "local_number_length": doc.local_number_length or 9,
-                "local_number_prefixes": (doc.local_number_prefixes or "").split(","),
+                "local_number_prefixes": split_prefixes(doc.local_number_prefixes),
                 "owner_number": doc.owner_number,
                 "timeout_seconds": doc.timeout_seconds or 30,
                 "max_retries": doc.max_retries or 3,
@@ -277,11 +401,11 @@ def get_settings():
             settings = {
                 "enabled": False,
                 "api_url": None,
-                "api_key": None,
+                "has_api_key": False,
                 "instance_name": None,
                 "default_country_code": "258",
                 "local_number_length": 9,
-                "local_number_prefixes": ["82", "83", "84", "85", "86", "87"],
+                "local_number_prefixes": ("82", "83", "84", "85", "86", "87"),
                 "owner_number": None,
                 "timeout_seconds": 30,
                 "max_retries": 3,
@@ -294,63 +418,83 @@ def get_settings():
                 "media_doctypes": [],
             }
 
+    frappe.local.wa_evolution_settings = settings
     return settings
 
 
+def get_api_key():
+    """
+    Get the decrypted Evolution API key
+
+    Kept out of the cached settings so the plain-text key never lands in
+    Redis; decrypted at most once per request/job.
+
+    Returns:
+        str: API key or None
+    """
+    api_key = getattr(frappe.local, "wa_evolution_api_key", None)
+    if api_key is None:
+        from frappe.utils.password import get_decrypted_password
+
+        api_key = get_decrypted_password(
+            "Evolution API Settings", "Evolution API Settings", "api_key", raise_exception=False
+        ) or ""
+        frappe.local.wa_evolution_api_key = api_key
+
+    return api_key or None
+
+
 def make_request(method, url, headers=None, data=None):
     """
     Make HTTP request compatible with v13-v15
     """
-    import json
+    from whatsapp_notifications.whatsapp_notifications.api import make_requests_call
+    from whatsapp_notifications.whatsapp_notifications.utils import prepare_json_body
 
-    headers = headers or {}
+    # Encode a JSON payload once for whichever method ends up sending it
+    headers, data = prepare_json_body(headers, data)
 
     # Method 1: frappe.integrations.utils (v14+)
     try:
         from frappe.integrations.utils import make_post_request, make_get_request
 
-        if method.upper() == "GET":
-            return make_get_request(url, headers=headers)
-        elif method.upper() == "POST":
-            if isinstance(data, dict):
-                # Try with json parameter first
-                try:
-                    return make_post_request(url, headers=headers, json=data)
-                except TypeError:
-                    # Fallback: encode manually
-                    headers["Content-Type"] = "application/json; charset=utf-8"
-                    return make_post_request(url, headers=headers, data=json.dumps(data, ensure_ascii=False).encode("utf-8"))
-            else:
-                return make_post_request(url, headers=headers, data=data)
+        # These calls (webhook/connection config) are idempotent, so transient
+        # failures are retried with exponential backoff before giving up
+        for attempt in range(INLINE_RETRIES + 1):
+            try:
+                if method.upper() == "GET":
+                    return make_get_request(url, headers=headers)
+                elif method.upper() == "POST":
+                    return make_post_request(url, headers=headers, data=data)
+                break
+            except Exception as e:
+                if attempt >= INLINE_RETRIES or not is_transient_http_error(e):
+                    raise
+                time.sleep(0.5 * (2 ** attempt))
 
     except ImportError:
         pass
     except Exception as e:
+        if is_transient_http_error(e):
+            # Retries are used up; the fallback would only hit the same outage
+            frappe.log_error(
+                "HTTP Request Failed: {} {} - {}".format(method, url, str(e)),
+                "WhatsApp HTTP Error"
+            )
+            raise
+
         # Log but continue to fallback
         frappe.log_error(
             "integrations.utils failed: {} - trying fallback".format(str(e)),
             "WhatsApp HTTP Debug"
         )
 
-    # Method 2: requests library (fallback)
+    # Method 2: requests library (fallback), shared with the message senders
     try:
-        import requests
-
-        if method.upper() == "GET":
-            response = requests.get(url, headers=headers, timeout=30)
-        elif method.upper() == "POST":
-            if isinstance(data, dict):
-                headers["Content-Type"] = "application/json; charset=utf-8"
-                response = requests.post(url, headers=headers, json=data, timeout=60)
-            else:
-                response = requests.post(url, headers=headers, data=data, timeout=60)
-        else:
+        if method.upper() not in ("GET", "POST"):
             raise ValueError("Unsupported HTTP method: {}".format(method))
 
-        if not response.ok:
-            raise Exception("HTTP {}: {}".format(response.status_code, response.text[:500]))
-
-        return response.json()
+        return make_requests_call(url, method=method, headers=headers, data=data)
 
     except Exception as e:
         frappe.log_error(
@@ -360,6 +504,55 @@ def make_request(method, url, headers=None, data=None):
         raise
 
 
+def is_transient_http_error(error):
+    """
+    Check whether an HTTP error is worth retrying
+
+    Args:
+        error: Exception raised by the HTTP call
+
+    Returns:
+        bool: True for connection errors, timeouts and 502/503/504 responses
+    """
+    from whatsapp_notifications.whatsapp_notifications.utils import get_requests
+
+    exceptions = get_requests().exceptions
+    if isinstance(error, (exceptions.ConnectionError, exceptions.Timeout)):
+        return True
+
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code in RETRY_STATUS_CODES
+
+
+def enqueue_settings_job(method_name):
+    """
+    Run an Evolution API Settings method in a short background job
+
+    Args:
+        method_name: One of BACKGROUND_SETTINGS_METHODS
+
+    Returns:
+        dict: Queued flag and job id
+    """
+    job = frappe.enqueue(
+        "whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings.run_settings_job",
+        queue="short",
+        timeout=120,
+        method_name=method_name
+    )
+    return {"success": True, "queued": True, "job_id": getattr(job, "id", None)}
+
+
+def run_settings_job(method_name):
+    """Background job for enqueue_settings_job"""
+    if method_name not in BACKGROUND_SETTINGS_METHODS:
+        frappe.throw(_("Method {0} cannot be run in the background").format(method_name))
+
+    doc = frappe.get_single("Evolution API Settings")
+    getattr(doc, method_name)()
+    frappe.db.commit()
+
+
 @frappe.whitelist()
 def test_api_connection():
     """Whitelist method to test connection from client"""
@@ -1,20 +1,39 @@
 # Copyright (c) 2024, Entretech and contributors
 # For license information, please see license.txt
 
+import json
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import now_datetime
 
+from whatsapp_notifications.whatsapp_notifications.utils import reserve_series_names
+
+# Columns the webhook needs to match and answer an incoming response
+PENDING_REQUEST_FIELDS = (
+    "name",
+    "status",
+    "approval_template",
+    "options_snapshot",
+    "recipient_phone",
+    "recipient_name",
+    "responded_at",
+)
+
 
 class WhatsAppApprovalRequest(Document):
+    # Status/response writes below are bookkeeping, not user edits, so they
+    # use update_modified=False and leave modified/modified_by alone
     def before_insert(self):
         if not self.sent_at:
             self.sent_at = now_datetime()
 
         if not self.expires_at and self.approval_template:
-            template = frappe.get_doc("WhatsApp Approval Template", self.approval_template)
-            expiry_hours = template.expiry_hours or 24
+            # Served from the document cache, which is cleared when the template is saved
+            expiry_hours = frappe.get_cached_value(
+                "WhatsApp Approval Template", self.approval_template, "expiry_hours"
+            ) or 24
             self.expires_at = frappe.utils.add_to_date(
                 self.sent_at,
                 hours=expiry_hours
@@ -32,18 +51,18 @@ class WhatsAppApprovalRequest(Document):
 
     def mark_expired(self):
         """Mark the request as expired"""
-        self.db_set("status", "Expired")
+        self.db_set("status", "Expired", update_modified=False)
 
     def mark_cancelled(self, reason=None):
         """Mark the request as cancelled"""
-        self.db_set("status", "Cancelled")
+        values = {"status": "Cancelled"}
         if reason:
-            self.db_set("error_message", reason)
+            values["error_message"] = reason
+        self.db_set(values, update_modified=False)
 
     def mark_error(self, error_message):
         """Mark the request as having an error"""
-        self.db_set("status", "Error")
-        self.db_set("error_message", error_message)
+        self.db_set({"status": "Error", "error_message": error_message}, update_modified=False)
 
     def record_response(self, option_number, response_text, response_from):
         """
@@ -54,10 +73,12 @@ class WhatsAppApprovalRequest(Document):
             response_text: Raw response text
             response_from: Phone number that responded
         """
-        self.db_set("response_option", option_number)
-        self.db_set("response_text", response_text)
-        self.db_set("response_from", response_from)
-        self.db_set("responded_at", now_datetime())
+        self.db_set({
+            "response_option": option_number,
+            "response_text": response_text,
+            "response_from": response_from,
+            "responded_at": now_datetime()
+        }, update_modified=False)
 
     def mark_processed(self, action_description, new_status="Approved"):
         """
@@ -67,36 +88,121 @@ class WhatsAppApprovalRequest(Document):
             action_description: Description of the action executed
             new_status: New status (Approved/Rejected based on action)
         """
-        self.db_set("processed", 1)
-        self.db_set("action_executed", action_description)
-        self.db_set("status", new_status)
+        self.db_set({
+            "processed": 1,
+            "action_executed": action_description,
+            "status": new_status
+        }, update_modified=False)
+
+
+def get_option_from_snapshot(options_snapshot, option_number, approval_template=None):
+    """
+    Find an option in a serialized options snapshot
+
+    Args:
+        options_snapshot: JSON list stored in options_snapshot
+        option_number: The option number
+        approval_template: Template to fall back to when there is no snapshot
+
+    Returns:
+        Option (dict-like) or None
+    """
+    if not options_snapshot:
+        if not approval_template:
+            return None
+        template = frappe.get_cached_doc("WhatsApp Approval Template", approval_template)
+        return template.get_option_by_number(option_number)
+
+    for option in json.loads(options_snapshot):
+        if option.get("option_number") == option_number:
+            return frappe._dict(option)
+    return None
+
+
+def insert_approval_requests(requests, expiry_hours=None):
+    """
+    Insert several approval requests with one naming update and one INSERT
+
+    Mirrors before_insert (sent_at / expires_at) since bulk rows skip the
+    document lifecycle. A single request goes through the normal insert.
+
+    Args:
+        requests: List of dicts with WhatsApp Approval Request field values
+        expiry_hours: Template expiry in hours (defaults to 24)
+
+    Returns:
+        list: WhatsApp Approval Request documents (already in the database)
+    """
+    if len(requests) == 1:
+        approval_request = frappe.get_doc(dict(requests[0], doctype="WhatsApp Approval Request"))
+        # message_log may be a pre-allocated name whose log is inserted right after
+        approval_request.flags.ignore_links = True
+        approval_request.insert(ignore_permissions=True)
+        return [approval_request]
+
+    now = now_datetime()
+    user = frappe.session.user
+    expires_at = frappe.utils.add_to_date(now, hours=expiry_hours or 24)
+
+    approval_requests = []
+    for name, values in zip(reserve_series_names("WAAPPR-", len(requests)), requests):
+        approval_requests.append(frappe.get_doc(dict(
+            values,
+            doctype="WhatsApp Approval Request",
+            name=name,
+            creation=now,
+            modified=now,
+            owner=user,
+            modified_by=user,
+            docstatus=0,
+            sent_at=now,
+            expires_at=expires_at
+        )))
+
+    fields = [
+        "name", "creation", "modified", "owner", "modified_by", "docstatus",
+        "status", "approval_template", "reference_doctype", "reference_name",
+        "recipient_phone", "formatted_phone", "recipient_name", "options_snapshot",
+        "message_log", "sent_at", "expires_at"
+    ]
+    frappe.db.bulk_insert(
+        "WhatsApp Approval Request",
+        fields=fields,
+        values=[tuple(ar.get(f) for f in fields) for ar in approval_requests]
+    )
+
+    return approval_requests
+
+
+def on_doctype_update():
+    """Composite index for the scheduled expiry sweep (expire_old_requests)"""
+    frappe.db.add_index("WhatsApp Approval Request", ["status", "expires_at"])
 
 
 def get_pending_request_by_phone(formatted_phone):
     """
     Find a pending approval request for a phone number
 
+    Only the columns in PENDING_REQUEST_FIELDS are read; load the document
+    with frappe.get_doc when it has to be modified.
+
     Args:
         formatted_phone: Formatted phone number to match
 
     Returns:
-        WhatsApp Approval Request or None
+        frappe._dict or None
     """
-    requests = frappe.get_all(
+    return frappe.db.get_value(
         "WhatsApp Approval Request",
-        filters={
+        {
             "status": "Pending",
             "formatted_phone": formatted_phone
         },
-        order_by="creation desc",
-        limit=1
+        PENDING_REQUEST_FIELDS,
+        as_dict=True,
+        order_by="creation desc"
     )
 
-    if requests:
-        return frappe.get_doc("WhatsApp Approval Request", requests[0].name)
-
-    return None
-
 
 def get_pending_requests_for_document(doctype, docname):
     """
@@ -122,16 +228,25 @@ def get_pending_requests_for_document(doctype, docname):
     return [frappe.get_doc("WhatsApp Approval Request", r.name) for r in requests]
 
 
-def cancel_pending_requests_for_document(doctype, docname, reason=None):
+def cancel_pending_requests_for_document(doctype, docname, reason=None, except_request_name=None):
     """
-    Cancel all pending approval requests for a document
+    Cancel all pending approval requests for a document in a single UPDATE
 
     Args:
         doctype: Document type
         docname: Document name
         reason: Optional reason for cancellation
+        except_request_name: Request name to leave untouched (optional)
     """
-    requests = get_pending_requests_for_document(doctype, docname)
-
-    for request in requests:
-        request.mark_cancelled(reason or "Superseded by new request")
+    conditions = "status = 'Pending' AND reference_doctype = %s AND reference_name = %s"
+    values = [reason or "Superseded by new request", now_datetime(), frappe.session.user, doctype, docname]
+
+    if except_request_name:
+        conditions += " AND name != %s"
+        values.append(except_request_name)
+
+    frappe.db.sql("""
+        UPDATE `tabWhatsApp Approval Request`
+        SET status = 'Cancelled', error_message = %s, modified = %s, modified_by = %s
+        WHERE {}
+    """.format(conditions), tuple(values))
@@ -1,10 +1,31 @@
 # Copyright (c) 2024, Entretech and contributors
 # For license information, please see license.txt
 
+import json
+import re
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
 
+from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
+from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_notification_rule.whatsapp_notification_rule import get_template_context
+from whatsapp_notifications.whatsapp_notifications.utils import render_cached_template
+
+# Separators allowed between fixed recipient numbers
+_RECIPIENT_SEPARATOR_RE = re.compile(r"[,\n]+")
+
+# Option fields copied onto each approval request when it is sent
+OPTION_SNAPSHOT_FIELDS = (
+    "option_number",
+    "option_label",
+    "action_type",
+    "workflow_action",
+    "field_to_update",
+    "field_value",
+    "method_path",
+)
+
 
 class WhatsAppApprovalTemplate(Document):
     def validate(self):
@@ -12,6 +33,12 @@ class WhatsAppApprovalTemplate(Document):
         self.validate_recipients()
         self.validate_trigger()
 
+    def on_update(self):
+        clear_templates_cache()
+
+    def on_trash(self):
+        clear_templates_cache()
+
     def validate_options(self):
         """Ensure option numbers are unique and sequential"""
         if not self.response_options:
@@ -28,6 +55,14 @@ class WhatsAppApprovalTemplate(Document):
             if num < 1:
                 frappe.throw(_("Option numbers must be positive integers"))
 
+        # Store options in number order so renders don't have to sort them
+        self.response_options.sort(key=lambda x: x.option_number)
+        for idx, option in enumerate(self.response_options, start=1):
+            option.idx = idx
+        self._sorted_options = None
+        self._options_text = None
+        self._options_by_number = None
+
     def validate_recipients(self):
         """Validate recipient configuration"""
         if self.recipient_type in ("Field Value", "Both") and not self.phone_field:
@@ -43,13 +78,7 @@ class WhatsAppApprovalTemplate(Document):
 
         if self.event == "Workflow State Change" and self.document_type:
             # Check if document type has a workflow
-            workflow = frappe.get_all(
-                "Workflow",
-                filters={"document_type": self.document_type, "is_active": 1},
-                limit=1
-            )
-
-            if not workflow:
+            if not has_active_workflow(self.document_type):
                 frappe.msgprint(
                     _("Note: No active workflow found for {0}. The workflow state trigger will not work.").format(
                         self.document_type
@@ -68,20 +97,22 @@ class WhatsAppApprovalTemplate(Document):
             list: List of phone numbers
         """
         recipients = []
+        seen = set()
 
         # Get from document field
         if self.recipient_type in ("Field Value", "Both") and self.phone_field:
             phone = get_phone_from_document(doc, self.phone_field)
             if phone:
                 recipients.append(phone)
+                seen.add(phone)
 
         # Get fixed recipients
         if self.recipient_type in ("Fixed Numbers", "Both") and self.fixed_recipients:
             # Parse fixed recipients (comma or newline separated)
-            fixed = self.fixed_recipients.replace(",", "\n")
-            for line in fixed.split("\n"):
+            for line in _RECIPIENT_SEPARATOR_RE.split(self.fixed_recipients):
                 phone = line.strip()
-                if phone and phone not in recipients:
+                if phone and phone not in seen:
+                    seen.add(phone)
                     recipients.append(phone)
 
         return recipients
@@ -96,12 +127,10 @@ class WhatsAppApprovalTemplate(Document):
         Returns:
             str: Rendered message with options appended
         """
-        from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_notification_rule.whatsapp_notification_rule import get_template_context
-
         context = get_template_context(doc)
 
         # Render main message
-        message = frappe.render_template(self.message_template, context)
+        message = render_cached_template(self.message_template, context)
 
         # Append response options with customizable text
         message += "\n\n"
@@ -109,9 +138,7 @@ class WhatsAppApprovalTemplate(Document):
         # Header text (customizable)
         header_text = self.options_header_text or _("Please respond with:")
         message += header_text + "\n"
-
-        for option in sorted(self.response_options, key=lambda x: x.option_number):
-            message += "{} - {}\n".format(option.option_number, option.option_label)
+        message += self.get_options_text()
 
         # Footer text (customizable)
         footer_text = self.options_footer_text or _("Reply with the number of your choice.")
@@ -138,13 +165,11 @@ class WhatsAppApprovalTemplate(Document):
             # Default confirmation
             return _("Thank you! {0} has been {1}.").format(doc.name, option_label)
 
-        from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_notification_rule.whatsapp_notification_rule import get_template_context
-
         context = get_template_context(doc)
         context["option_label"] = option_label
         context["action_result"] = action_result
 
-        return frappe.render_template(self.confirmation_template, context)
+        return render_cached_template(self.confirmation_template, context)
 
     def render_invalid_response_message(self, received_text):
         """
@@ -159,33 +184,57 @@ class WhatsAppApprovalTemplate(Document):
         if not self.send_invalid_response_help:
             return None
 
-        # Build options list for context
-        options = []
-        for option in sorted(self.response_options, key=lambda x: x.option_number):
-            options.append({
-                "number": option.option_number,
-                "label": option.option_label
-            })
-
         if self.invalid_response_template:
+            # Build options list for context
+            options = [
+                {"number": option.option_number, "label": option.option_label}
+                for option in self.get_sorted_options()
+            ]
             context = {
                 "received_text": received_text[:50] if received_text else "",
                 "options": options
             }
-            return frappe.render_template(self.invalid_response_template, context)
+            return render_cached_template(self.invalid_response_template, context)
 
         # Default message
         message = _("Sorry, I didn't understand your response: '{0}'").format(received_text[:50] if received_text else "")
         message += "\n\n"
         message += (self.options_header_text or _("Please respond with:")) + "\n"
-
-        for option in options:
-            message += "{} - {}\n".format(option["number"], option["label"])
+        message += self.get_options_text()
 
         message += "\n" + _("Reply with just the number.")
 
         return message
 
+    def get_sorted_options(self):
+        """
+        Get the response options ordered by option number (sorted once per instance)
+
+        Returns:
+            list: WhatsApp Approval Option rows
+        """
+        sorted_options = getattr(self, "_sorted_options", None)
+        if sorted_options is None:
+            sorted_options = self._sorted_options = sorted(
+                self.response_options, key=lambda x: x.option_number
+            )
+        return sorted_options
+
+    def get_options_text(self):
+        """
+        Get the "N - Label" option lines appended to approval messages
+
+        Returns:
+            str: One line per option, each ending with a newline
+        """
+        options_text = getattr(self, "_options_text", None)
+        if options_text is None:
+            options_text = self._options_text = "".join(
+                "{} - {}\n".format(option.option_number, option.option_label)
+                for option in self.get_sorted_options()
+            )
+        return options_text
+
     def get_option_by_number(self, option_number):
         """
         Get an option by its number
@@ -196,10 +245,24 @@ class WhatsAppApprovalTemplate(Document):
         Returns:
             WhatsApp Approval Option or None
         """
-        for option in self.response_options:
-            if option.option_number == option_number:
-                return option
-        return None
+        options_by_number = getattr(self, "_options_by_number", None)
+        if options_by_number is None:
+            options_by_number = self._options_by_number = {
+                option.option_number: option for option in self.response_options
+            }
+        return options_by_number.get(option_number)
+
+    def get_options_snapshot(self):
+        """
+        Serialize the response options so they can be stored on an approval request
+
+        Returns:
+            str: JSON list of option dicts
+        """
+        return json.dumps([
+            {fieldname: option.get(fieldname) for fieldname in OPTION_SNAPSHOT_FIELDS}
+            for option in self.response_options
+        ])
 
     def check_condition(self, doc):
         """
@@ -214,14 +277,15 @@ class WhatsAppApprovalTemplate(Document):
         if not self.condition:
             return True
 
+        # A condition without Jinja markup ("1", "true", ...) renders to itself
+        if "{" not in self.condition:
+            return _is_truthy_condition(self.condition)
+
         try:
-            from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_notification_rule.whatsapp_notification_rule import get_template_context
             context = get_template_context(doc)
-            result = frappe.render_template(self.condition, context)
+            result = render_cached_template(self.condition, context)
 
-            # Handle various truthy values
-            result = result.strip().lower()
-            return result in ("true", "1", "yes")
+            return _is_truthy_condition(result)
 
         except Exception as e:
             frappe.log_error(
@@ -231,6 +295,17 @@ class WhatsAppApprovalTemplate(Document):
             return False
 
 
+def _is_truthy_condition(result):
+    """Interpret a rendered condition; "true", "1" and "yes" count as met"""
+    return result.strip().lower() in ("true", "1", "yes")
+
+
+def on_doctype_update():
+    """Composite indexes for the event / workflow-state template lookups"""
+    frappe.db.add_index("WhatsApp Approval Template", ["enabled", "document_type", "event"])
+    frappe.db.add_index("WhatsApp Approval Template", ["enabled", "document_type", "workflow_state"])
+
+
 def get_phone_from_document(doc, phone_field):
     """
     Get phone number from document using field path
@@ -249,38 +324,61 @@ def get_phone_from_document(doc, phone_field):
         # Handle dot notation (e.g., "customer.mobile_no")
         if "." in phone_field:
             parts = phone_field.split(".")
-            value = doc
-
-            for i, part in enumerate(parts):
-                if i == 0:
-                    # First part is a field on the document
-                    value = getattr(value, part, None)
-                else:
-                    # Subsequent parts need to fetch from linked doc
-                    if value and i == 1:
-                        # Get the linked doctype from meta
-                        prev_field = parts[i - 1]
-                        meta = frappe.get_meta(doc.doctype)
-                        field_meta = meta.get_field(prev_field)
-
-                        if field_meta and field_meta.fieldtype == "Link":
-                            linked_doctype = field_meta.options
-                            value = frappe.db.get_value(linked_doctype, value, part)
-                        else:
-                            return None
-                    else:
-                        return None
-
-                if not value:
-                    return None
-
-            return value
+
+            # Only one link hop is supported: link_field.target_field
+            if len(parts) != 2:
+                return None
+
+            link_field, target_field = parts
+            link_value = getattr(doc, link_field, None)
+            if not link_value:
+                return None
+
+            linked_doctype = _link_target(doc.doctype, link_field)
+            if not linked_doctype:
+                return None
+
+            return frappe.db.get_value(linked_doctype, link_value, target_field, cache=True) or None
         else:
             return getattr(doc, phone_field, None)
     except Exception:
         return None
 
 
+def _link_target(doctype, fieldname):
+    """DocType a Link field points to (None if it isn't a Link); meta is cached per site"""
+    field_meta = frappe.get_meta(doctype).get_field(fieldname)
+    if field_meta and field_meta.fieldtype == "Link":
+        return field_meta.options
+    return None
+
+
+def has_active_workflow(doctype):
+    """
+    Check whether a DocType has an active Workflow (cached for 5 minutes)
+
+    Args:
+        doctype: Document type
+
+    Returns:
+        bool
+    """
+    cache_key = "whatsapp_active_workflow_{}".format(doctype)
+    active = frappe.cache().get_value(cache_key)
+
+    if active is None:
+        active = 1 if frappe.db.exists("Workflow", {"document_type": doctype, "is_active": 1}) else 0
+        frappe.cache().set_value(cache_key, active, expires_in_sec=300)
+
+    return bool(active)
+
+
+def clear_active_workflow_cache(doc, method=None):
+    """Workflow on_update / on_trash hook: drop the cached flag for its DocType"""
+    if doc.document_type:
+        frappe.cache().delete_value("whatsapp_active_workflow_{}".format(doc.document_type))
+
+
 def get_template_for_workflow_state(doctype, workflow_state):
     """
     Get approval template triggered by a workflow state
@@ -292,20 +390,29 @@ def get_template_for_workflow_state(doctype, workflow_state):
     Returns:
         WhatsApp Approval Template or None
     """
+    if doctype not in get_active_doctypes():
+        return None
+
     try:
-        templates = frappe.get_all(
-            "WhatsApp Approval Template",
-            filters={
-                "enabled": 1,
-                "document_type": doctype,
-                "event": "Workflow State Change",
-                "workflow_state": workflow_state
-            },
-            limit=1
+        def fetch():
+            name = frappe.db.get_value(
+                "WhatsApp Approval Template",
+                {
+                    "enabled": 1,
+                    "document_type": doctype,
+                    "event": "Workflow State Change",
+                    "workflow_state": workflow_state
+                },
+                "name"
+            )
+            return get_template_dicts([name] if name else [])
+
+        templates = get_cached_template_lookup(
+            "workflow_{}_{}".format(doctype, workflow_state), fetch
         )
 
         if templates:
-            return frappe.get_doc("WhatsApp Approval Template", templates[0].name)
+            return frappe.get_doc(templates[0])
 
         return None
     except Exception:
@@ -324,24 +431,32 @@ def get_templates_for_event(doctype, event):
     Returns:
         list: List of WhatsApp Approval Template documents
     """
+    # Most doctypes have no approval templates at all
+    if doctype not in get_active_doctypes():
+        return []
+
     try:
-        # Check if table exists and has the event column
-        if not frappe.db.table_exists("WhatsApp Approval Template"):
-            return []
+        def fetch():
+            # Check if table exists and has the event column
+            if not frappe.db.table_exists("WhatsApp Approval Template"):
+                return []
+
+            names = frappe.get_all(
+                "WhatsApp Approval Template",
+                filters={
+                    "enabled": 1,
+                    "document_type": doctype,
+                    "event": event
+                },
+                pluck="name"
+            )
+            return get_template_dicts(names)
 
-        templates = frappe.get_all(
-            "WhatsApp Approval Template",
-            filters={
-                "enabled": 1,
-                "document_type": doctype,
-                "event": event
-            }
-        )
+        templates = get_cached_template_lookup("event_{}_{}".format(doctype, event), fetch)
 
-        return [frappe.get_doc("WhatsApp Approval Template", t.name) for t in templates]
+        return [frappe.get_doc(t) for t in templates]
     except Exception as e:
         # Log the error for debugging if debug mode is on
-        from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
         try:
             settings = get_settings()
             if settings.get("enable_debug_logging"):
@@ -352,3 +467,116 @@ def get_templates_for_event(doctype, event):
         except Exception:
             pass
         return []
+
+
+def get_active_doctypes():
+    """
+    Get the set of doctypes targeted by at least one enabled approval template
+
+    Returns:
+        frozenset: Document type names
+    """
+    active = getattr(frappe.local, "wa_approval_active_doctypes", None)
+    if active is not None:
+        return active
+
+    cache_key = "whatsapp_approval_templates_active_doctypes"
+    doctypes = frappe.cache().get_value(cache_key)
+
+    if doctypes is None:
+        try:
+            doctypes = frappe.get_all(
+                "WhatsApp Approval Template",
+                filters={"enabled": 1},
+                pluck="document_type",
+                distinct=True
+            )
+        except Exception:
+            # Table might not exist during migration
+            return frozenset()
+
+        frappe.cache().set_value(cache_key, doctypes, expires_in_sec=300)
+
+    frappe.local.wa_approval_active_doctypes = frozenset(doctypes)
+    return frappe.local.wa_approval_active_doctypes
+
+
+def get_template_dicts(names):
+    """
+    Load full templates (with response options) in two queries
+
+    Args:
+        names: Template names
+
+    Returns:
+        list: Template dicts (in the order of names) that frappe.get_doc can
+            turn back into documents without touching the database
+    """
+    if not names:
+        return []
+
+    parents = {
+        row.name: row
+        for row in frappe.get_all(
+            "WhatsApp Approval Template",
+            filters={"name": ["in", names]},
+            fields=["*"]
+        )
+    }
+
+    options = {}
+    for row in frappe.get_all(
+        "WhatsApp Approval Option",
+        filters={
+            "parent": ["in", names],
+            "parenttype": "WhatsApp Approval Template",
+            "parentfield": "response_options"
+        },
+        fields=["*"],
+        order_by="idx asc"
+    ):
+        options.setdefault(row.parent, []).append(row)
+
+    return [
+        dict(parents[name], doctype="WhatsApp Approval Template", response_options=options.get(name, []))
+        for name in names
+        if name in parents
+    ]
+
+
+def get_cached_template_lookup(key, fetch):
+    """
+    Get a template lookup result from the request memo, then Redis, then the database
+
+    Empty results are cached too, so documents without templates return
+    without a query. Cleared whenever a template is saved or deleted.
+
+    Args:
+        key: Lookup key (trigger type, doctype and event/state)
+        fetch: Callable returning the list of template names or template dicts
+
+    Returns:
+        list: Whatever fetch returned
+    """
+    if not hasattr(frappe.local, "wa_approval_template_lookups"):
+        frappe.local.wa_approval_template_lookups = {}
+
+    local_cache = frappe.local.wa_approval_template_lookups
+    if key in local_cache:
+        return local_cache[key]
+
+    cache_key = "whatsapp_approval_templates_{}".format(key)
+    result = frappe.cache().get_value(cache_key)
+
+    if result is None:
+        result = fetch()
+        frappe.cache().set_value(cache_key, result, expires_in_sec=300)
+
+    local_cache[key] = result
+    return result
+
+
+def clear_templates_cache():
+    frappe.cache().delete_keys("whatsapp_approval_templates_*")
+    frappe.local.wa_approval_template_lookups = {}
+    frappe.local.wa_approval_active_doctypes = None
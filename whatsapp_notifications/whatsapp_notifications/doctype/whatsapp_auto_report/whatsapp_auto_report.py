@@ -6,10 +6,73 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import now_datetime, getdate, get_datetime, add_days, get_first_day, get_last_day, today
 import json
+from operator import itemgetter
+
+from whatsapp_notifications.whatsapp_notifications.utils import loads_json, render_cached_template
+
+# MIME type sent to the Evolution API for each generated attachment type
+ATTACHMENT_MIMETYPES = {
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+# Same replacements as frappe.utils.escape_html, applied with str.translate
+# (one C-level pass per cell) for large report tables
+HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    '"': "&quot;",
+    "'": "&apos;",
+    ">": "&gt;",
+    "<": "&lt;",
+})
+
+# day_of_week options, indexed by date.weekday()
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Quarterly reports go out on day_of_month of Jan, Apr, Jul, Oct
+QUARTER_MONTHS = (1, 4, 7, 10)
+
+# Page layout for build_pdf_html (CSS braces are doubled for str.format)
+PDF_TEMPLATE = """
+<html>
+<head>
+    <style>
+        body {{ font-family: Arial, sans-serif; font-size: 10px; }}
+        h1 {{ font-size: 16px; margin-bottom: 10px; }}
+        .meta {{ color: #666; margin-bottom: 20px; }}
+        table {{ width: 100%; border-collapse: collapse; }}
+        th, td {{ border: 1px solid #ddd; padding: 6px; text-align: left; }}
+        th {{ background-color: #f5f5f5; font-weight: bold; }}
+        tr:nth-child(even) {{ background-color: #fafafa; }}
+    </style>
+</head>
+<body>
+    <h1>{report_name}</h1>
+    <div class="meta">
+        Gerado em: {datetime}<br>
+        Total de registros: {rows}
+    </div>
+    <table>
+        <thead>
+            <tr>
+                {headers}
+            </tr>
+        </thead>
+        <tbody>
+            {rows_html}
+        </tbody>
+    </table>
+</body>
+</html>
+"""
 
 
 class WhatsAppAutoReport(Document):
+    # Parsed filters, memoized by get_filters for the lifetime of the instance
+    _filters_cache = None
+
     def validate(self):
+        self._filters_cache = None
         self.validate_filters()
         self.validate_schedule()
 
@@ -17,7 +80,7 @@ class WhatsAppAutoReport(Document):
         """Validate JSON filters"""
         if self.filters:
             try:
-                json.loads(self.filters)
+                loads_json(self.filters)
             except json.JSONDecodeError:
                 frappe.throw(_("Filters must be valid JSON"))
 
@@ -33,13 +96,16 @@ class WhatsAppAutoReport(Document):
             frappe.throw(_("Day of Month must be between 1 and 28"))
 
     def get_filters(self):
-        """Get report filters with dynamic date handling"""
+        """Get report filters with dynamic date handling (computed once per instance)"""
+        if self._filters_cache is not None:
+            return self._filters_cache
+
         filters = {}
 
         # Parse static filters
         if self.filters:
             try:
-                filters = json.loads(self.filters)
+                filters = loads_json(self.filters)
             except json.JSONDecodeError:
                 pass
 
@@ -48,6 +114,7 @@ class WhatsAppAutoReport(Document):
             date_filters = self.parse_dynamic_filters()
             filters.update(date_filters)
 
+        self._filters_cache = filters
         return filters
 
     def parse_dynamic_filters(self):
@@ -58,19 +125,21 @@ class WhatsAppAutoReport(Document):
         filters = {}
         today_date = getdate(today())
 
-        date_ranges = {
-            "today": (today_date, today_date),
-            "yesterday": (add_days(today_date, -1), add_days(today_date, -1)),
-            "this_week": (add_days(today_date, -today_date.weekday()), today_date),
-            "last_week": (add_days(today_date, -today_date.weekday() - 7), add_days(today_date, -today_date.weekday() - 1)),
-            "this_month": (get_first_day(today_date), today_date),
-            "last_month": (get_first_day(add_days(get_first_day(today_date), -1)), add_days(get_first_day(today_date), -1)),
-            "this_quarter": self.get_quarter_dates(today_date, current=True),
-            "last_quarter": self.get_quarter_dates(today_date, current=False),
-            "this_year": (frappe.utils.get_first_day_of_year(today_date), today_date),
-            "last_year": (frappe.utils.get_first_day_of_year(add_days(frappe.utils.get_first_day_of_year(today_date), -1)),
-                         frappe.utils.get_last_day_of_year(add_days(frappe.utils.get_first_day_of_year(today_date), -1)))
+        # Ranges are built on demand, only for the periods actually referenced
+        date_range_builders = {
+            "today": lambda: (today_date, today_date),
+            "yesterday": lambda: (add_days(today_date, -1), add_days(today_date, -1)),
+            "this_week": lambda: (add_days(today_date, -today_date.weekday()), today_date),
+            "last_week": lambda: (add_days(today_date, -today_date.weekday() - 7), add_days(today_date, -today_date.weekday() - 1)),
+            "this_month": lambda: (get_first_day(today_date), today_date),
+            "last_month": lambda: (get_first_day(add_days(get_first_day(today_date), -1)), add_days(get_first_day(today_date), -1)),
+            "this_quarter": lambda: self.get_quarter_dates(today_date, current=True),
+            "last_quarter": lambda: self.get_quarter_dates(today_date, current=False),
+            "this_year": lambda: (frappe.utils.get_first_day_of_year(today_date), today_date),
+            "last_year": lambda: (frappe.utils.get_first_day_of_year(add_days(frappe.utils.get_first_day_of_year(today_date), -1)),
+                                  frappe.utils.get_last_day_of_year(add_days(frappe.utils.get_first_day_of_year(today_date), -1)))
         }
+        date_ranges = {}
 
         # Parse expressions like "from_date:this_month, to_date:this_month"
         for expr in self.dynamic_filters.split(","):
@@ -80,7 +149,9 @@ class WhatsAppAutoReport(Document):
                 field = field.strip()
                 period = period.strip().lower()
 
-                if period in date_ranges:
+                if period in date_range_builders:
+                    if period not in date_ranges:
+                        date_ranges[period] = date_range_builders[period]()
                     from_date, to_date = date_ranges[period]
                     if "from" in field.lower() or "start" in field.lower():
                         filters[field] = str(from_date)
@@ -113,126 +184,79 @@ class WhatsAppAutoReport(Document):
 
     def should_send_today(self):
         """Check if report should be sent today"""
-        today_date = getdate(today())
-        now = now_datetime()
-
-        if self.frequency == "Daily":
-            return True
-
-        elif self.frequency == "Weekly":
-            day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            return day_names[today_date.weekday()] == self.day_of_week
-
-        elif self.frequency == "Monthly":
-            return today_date.day == self.day_of_month
-
-        elif self.frequency == "Quarterly":
-            # Send on day_of_month of Jan, Apr, Jul, Oct
-            quarter_months = [1, 4, 7, 10]
-            return today_date.month in quarter_months and today_date.day == self.day_of_month
-
-        return False
+        return report_should_send_today(self)
 
     def is_time_to_send(self):
         """Check if it's time to send (within 30 min window)"""
-        if not self.send_time:
-            return False
-
-        now = now_datetime()
-        send_time = get_datetime("{} {}".format(today(), self.send_time))
-
-        # Check if we're within 30 minutes after send_time
-        diff_minutes = (now - send_time).total_seconds() / 60
-
-        return 0 <= diff_minutes <= 30
+        return report_is_time_to_send(self)
 
     def was_sent_today(self):
         """Check if report was already sent today"""
-        if not self.last_sent:
-            return False
-
-        return getdate(self.last_sent) == getdate(today())
+        return report_was_sent_today(self)
 
     @frappe.whitelist()
     def generate_and_send(self):
         """Generate report and send via WhatsApp"""
         try:
+            filters = self.get_filters()
+
             # Generate report data
-            report_data = self.get_report_data()
+            report_data = self.get_report_data(filters)
 
             if not report_data and self.send_if_data:
-                self.db_set("last_status", "Skipped - No data")
+                self.db_set({"last_status": "Skipped - No data"}, update_modified=False)
                 return {"success": True, "skipped": True, "reason": "No data"}
 
             # Build message
-            message = self.build_message(report_data)
+            message = self.build_message(report_data, filters)
 
-            # Generate attachments
+            # Generate attachments (only when there are rows to put in them)
             attachments = []
+            has_data = bool(report_data and report_data.get("result"))
 
-            if self.include_excel:
+            if self.include_excel and has_data:
                 excel_data = self.generate_excel(report_data)
                 if excel_data:
                     attachments.append({
                         "type": "excel",
-                        "data": excel_data,
+                        "b64": encode_attachment(excel_data),
                         "filename": "{}.xlsx".format(self.report_name.replace(" ", "_"))
                     })
 
-            if self.include_pdf:
+            if self.include_pdf and has_data:
                 pdf_data = self.generate_pdf(report_data)
                 if pdf_data:
                     attachments.append({
                         "type": "pdf",
-                        "data": pdf_data,
+                        "b64": encode_attachment(pdf_data),
                         "filename": "{}.pdf".format(self.report_name.replace(" ", "_"))
                     })
 
             # Send to all recipients
             recipients = self.get_recipients()
-            sent_count = 0
-            errors = []
 
-            for phone in recipients:
-                try:
-                    if attachments:
-                        # Send with attachment (use first attachment as primary)
-                        result = send_report_with_attachment(
-                            phone=phone,
-                            message=message,
-                            attachments=attachments,
-                            report_name=self.report_name
-                        )
-                    else:
-                        # Send text only
-                        from whatsapp_notifications.whatsapp_notifications.api import send_whatsapp_notification
-                        result = send_whatsapp_notification(
-                            phone=phone,
-                            message=message,
-                            reference_doctype="WhatsApp Auto Report",
-                            reference_name=self.name,
-                            notification_rule=None,
-                            recipient_name=None
-                        )
-
-                    if result.get("success") or result.get("queued"):
-                        sent_count += 1
-                    else:
-                        errors.append("{}: {}".format(phone, result.get("error", "Unknown error")))
+            if attachments:
+                results = send_report_to_recipients(recipients, message, attachments)
+            else:
+                results = self.send_text_to_recipients(recipients, message)
 
-                except Exception as e:
-                    errors.append("{}: {}".format(phone, str(e)))
+            sent_count = 0
+            errors = []
 
-            # Update status
-            self.db_set("last_sent", now_datetime())
+            for phone, result in results:
+                if result.get("success") or result.get("queued"):
+                    sent_count += 1
+                else:
+                    errors.append("{}: {}".format(phone, result.get("error", "Unknown error")))
 
+            # Update status in one UPDATE; bookkeeping, so modified is left alone
             if sent_count > 0:
-                self.db_set("last_status", "Sent to {} recipients".format(sent_count))
-                self.db_set("last_error", None)
+                status = {"last_status": "Sent to {} recipients".format(sent_count), "last_error": None}
             else:
-                self.db_set("last_status", "Failed")
-                self.db_set("last_error", "\n".join(errors[:5]))  # First 5 errors
+                status = {"last_status": "Failed", "last_error": "\n".join(errors[:5])}  # First 5 errors
 
+            status["last_sent"] = now_datetime()
+            self.db_set(status, update_modified=False)
             frappe.db.commit()
 
             return {
@@ -242,8 +266,7 @@ class WhatsAppAutoReport(Document):
             }
 
         except Exception as e:
-            self.db_set("last_status", "Error")
-            self.db_set("last_error", str(e)[:500])
+            self.db_set({"last_status": "Error", "last_error": str(e)[:500]}, update_modified=False)
             frappe.db.commit()
 
             frappe.log_error(
@@ -252,16 +275,64 @@ class WhatsAppAutoReport(Document):
             )
             return {"success": False, "error": str(e)}
 
-    def get_report_data(self):
+    def send_text_to_recipients(self, recipients, message):
+        """
+        Send a text-only report to every recipient
+
+        Message logs are created without committing; logs meant for immediate
+        sending are then sent together after a single commit.
+
+        Args:
+            recipients: List of phone numbers
+            message: Message text
+
+        Returns:
+            list: (phone, result) tuples in recipient order
+        """
+        from whatsapp_notifications.whatsapp_notifications.api import (
+            process_message_logs,
+            send_whatsapp_notification,
+        )
+
+        results = []
+        for phone in recipients:
+            try:
+                result = send_whatsapp_notification(
+                    phone=phone,
+                    message=message,
+                    reference_doctype="WhatsApp Auto Report",
+                    reference_name=self.name,
+                    notification_rule=None,
+                    recipient_name=None,
+                    commit=False
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            results.append((phone, result))
+
+        frappe.db.commit()
+
+        deferred = [result["log"] for phone, result in results if result.get("send_after_commit")]
+        if deferred:
+            sent = process_message_logs(deferred)
+            results = [
+                (phone, sent.get(result["log"], result) if result.get("send_after_commit") else result)
+                for phone, result in results
+            ]
+
+        return results
+
+    def get_report_data(self, filters=None):
         """Get report data"""
-        filters = self.get_filters()
+        if filters is None:
+            filters = self.get_filters()
 
         # Set user context for permissions
         user = self.user or "Administrator"
 
         try:
-            # Get report document
-            report = frappe.get_doc("Report", self.report)
+            # Served from the document cache, which frappe clears when the Report is saved
+            report = frappe.get_cached_doc("Report", self.report)
 
             if report.report_type == "Report Builder":
                 # Report Builder reports
@@ -324,15 +395,18 @@ class WhatsAppAutoReport(Document):
 
         return recipients
 
-    def build_message(self, report_data):
+    def build_message(self, report_data, filters=None):
         """Build the message to send"""
+        if filters is None:
+            filters = self.get_filters()
+
         context = {
             "report_name": self.report,
             "date": today(),
             "datetime": now_datetime().strftime("%Y-%m-%d %H:%M"),
             "rows": len(report_data.get("result", [])) if report_data else 0,
             "summary": "",
-            "filters": self.get_filters()
+            "filters": filters
         }
 
         # Build summary if enabled
@@ -342,16 +416,17 @@ class WhatsAppAutoReport(Document):
         # Build report link if enabled
         if self.include_link:
             from urllib.parse import urlencode
-            filters_str = urlencode(self.get_filters())
+            filters_str = urlencode(filters)
             context["link"] = "{}/app/query-report/{}?{}".format(
                 frappe.utils.get_url(),
                 self.report.replace(" ", "%20"),
                 filters_str
             )
 
-        # Render custom template or use default
+        # Render custom template or use default (compiled against this job's
+        # Jinja environment; render_cached_template caches it on frappe.local)
         if self.message_template:
-            message = frappe.render_template(self.message_template, context)
+            message = render_cached_template(self.message_template, context)
         else:
             message = self.get_default_message(context)
 
@@ -359,49 +434,49 @@ class WhatsAppAutoReport(Document):
 
     def get_default_message(self, context):
         """Get default message template"""
-        message = "📊 *Relatório: {}*\n".format(context["report_name"])
-        message += "Data: {}\n\n".format(context["datetime"])
+        # Collected as lines and joined once
+        lines = [
+            "📊 *Relatório: {}*".format(context["report_name"]),
+            "Data: {}".format(context["datetime"]),
+            ""
+        ]
 
         if context["rows"] > 0:
-            message += "Total de registros: {}\n".format(context["rows"])
+            lines.append("Total de registros: {}".format(context["rows"]))
 
             if context.get("summary"):
-                message += "\n{}\n".format(context["summary"])
+                lines.extend(("", context["summary"]))
         else:
-            message += "Nenhum dado encontrado para os filtros aplicados.\n"
+            lines.append("Nenhum dado encontrado para os filtros aplicados.")
 
         if context.get("link"):
-            message += "\n🔗 Ver relatório completo:\n{}\n".format(context["link"])
+            lines.extend(("", "🔗 Ver relatório completo:", context["link"]))
 
         if self.include_excel or self.include_pdf:
-            message += "\n📎 Arquivo(s) em anexo"
+            lines.extend(("", "📎 Arquivo(s) em anexo"))
+        else:
+            lines.append("")
 
-        return message
+        return "\n".join(lines)
 
     def build_summary(self, report_data, max_rows=5):
         """Build text summary of report data"""
-        if not report_data or not report_data.get("result"):
-            return ""
-
-        columns = report_data.get("columns", [])
-        data = report_data.get("result", [])[:max_rows]
+        result = report_data.get("result") if report_data else None
+        columns = report_data.get("columns", []) if report_data else None
 
-        if not columns or not data:
+        if not result or not columns:
             return ""
 
-        # Get column names
-        col_names = []
-        for col in columns[:5]:  # Max 5 columns in summary
-            if isinstance(col, dict):
-                col_names.append(col.get("label", col.get("fieldname", "")))
-            else:
-                col_names.append(str(col))
+        total = len(result)
+
+        # Max 5 columns in summary; dict rows only use the dict columns
+        fieldnames = [col.get("fieldname", "") for col in columns[:5] if isinstance(col, dict)]
 
         summary_lines = []
 
-        for row in data:
+        for row in result[:max_rows]:
             if isinstance(row, dict):
-                values = [str(row.get(col.get("fieldname", ""), ""))[:20] for col in columns[:5] if isinstance(col, dict)]
+                values = [str(row.get(fieldname, ""))[:20] for fieldname in fieldnames]
             elif isinstance(row, (list, tuple)):
                 values = [str(v)[:20] for v in row[:5]]
             else:
@@ -409,47 +484,53 @@ class WhatsAppAutoReport(Document):
 
             summary_lines.append(" | ".join(values))
 
-        if len(report_data.get("result", [])) > max_rows:
-            summary_lines.append("... e mais {} registros".format(len(report_data["result"]) - max_rows))
+        if total > max_rows:
+            summary_lines.append("... e mais {} registros".format(total - max_rows))
 
         return "\n".join(summary_lines)
 
     def generate_excel(self, report_data):
-        """Generate Excel file from report data"""
-        if not report_data or not report_data.get("result"):
-            return None
-
+        """Generate Excel file from report data (expects at least one row)"""
         try:
             import io
-            from frappe.utils.xlsxutils import make_xlsx
+            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+            from openpyxl.styles import Font
+            from frappe.utils.xlsxutils import handle_html
 
             columns = report_data.get("columns", [])
             data = report_data.get("result", [])
 
-            # Format columns for xlsx
-            xlsx_columns = []
-            for col in columns:
-                if isinstance(col, dict):
-                    xlsx_columns.append(col.get("label", col.get("fieldname", "")))
-                else:
-                    xlsx_columns.append(str(col))
+            get_values = make_row_getter(get_column_keys(columns))
+
+            def clean(value):
+                # Same text cleanup make_xlsx applies
+                if isinstance(value, str):
+                    return ILLEGAL_CHARACTERS_RE.sub("", handle_html(value))
+                return value
 
-            # Format data rows
-            xlsx_data = [xlsx_columns]  # Header row
+            # write_only streams rows to a temporary file instead of
+            # keeping the whole sheet in memory
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet(self.report[:31])
+
+            header_font = Font(name="Calibri", bold=True)
+            header = []
+            for label in get_column_labels(columns):
+                cell = WriteOnlyCell(ws, value=clean(label))
+                cell.font = header_font
+                header.append(cell)
+            ws.append(header)
 
             for row in data:
                 if isinstance(row, dict):
-                    row_data = []
-                    for col in columns:
-                        if isinstance(col, dict):
-                            row_data.append(row.get(col.get("fieldname", ""), ""))
-                        else:
-                            row_data.append(row.get(col, ""))
-                    xlsx_data.append(row_data)
+                    ws.append([clean(value) for value in get_values(row)])
                 elif isinstance(row, (list, tuple)):
-                    xlsx_data.append(list(row))
+                    ws.append([clean(value) for value in row])
 
-            xlsx_file = make_xlsx(xlsx_data, self.report)
+            xlsx_file = io.BytesIO()
+            wb.save(xlsx_file)
             return xlsx_file.getvalue()
 
         except Exception as e:
@@ -460,10 +541,7 @@ class WhatsAppAutoReport(Document):
             return None
 
     def generate_pdf(self, report_data):
-        """Generate PDF from report data"""
-        if not report_data or not report_data.get("result"):
-            return None
-
+        """Generate PDF from report data (expects at least one row)"""
         try:
             # Build HTML for PDF
             html = self.build_pdf_html(report_data)
@@ -484,50 +562,13 @@ class WhatsAppAutoReport(Document):
         columns = report_data.get("columns", [])
         data = report_data.get("result", [])
 
-        # Get column headers
-        headers = []
-        for col in columns:
-            if isinstance(col, dict):
-                headers.append(col.get("label", col.get("fieldname", "")))
-            else:
-                headers.append(str(col))
-
-        html = """
-        <html>
-        <head>
-            <style>
-                body { font-family: Arial, sans-serif; font-size: 10px; }
-                h1 { font-size: 16px; margin-bottom: 10px; }
-                .meta { color: #666; margin-bottom: 20px; }
-                table { width: 100%; border-collapse: collapse; }
-                th, td { border: 1px solid #ddd; padding: 6px; text-align: left; }
-                th { background-color: #f5f5f5; font-weight: bold; }
-                tr:nth-child(even) { background-color: #fafafa; }
-            </style>
-        </head>
-        <body>
-            <h1>{report_name}</h1>
-            <div class="meta">
-                Gerado em: {datetime}<br>
-                Total de registros: {rows}
-            </div>
-            <table>
-                <thead>
-                    <tr>
-                        {headers}
-                    </tr>
-                </thead>
-                <tbody>
-                    {rows_html}
-                </tbody>
-            </table>
-        </body>
-        </html>
-        """.format(
-            report_name=self.report,
+        headers = get_column_labels(columns)
+
+        html = PDF_TEMPLATE.format(
+            report_name=self.report.translate(HTML_ESCAPE_TABLE),
             datetime=now_datetime().strftime("%Y-%m-%d %H:%M"),
             rows=len(data),
-            headers="".join(["<th>{}</th>".format(h) for h in headers]),
+            headers="".join(f"<th>{str(h or '').translate(HTML_ESCAPE_TABLE)}</th>" for h in headers),
             rows_html=self.build_table_rows(columns, data)
         )
 
@@ -535,30 +576,70 @@ class WhatsAppAutoReport(Document):
 
     def build_table_rows(self, columns, data):
         """Build HTML table rows"""
-        rows_html = []
+        col_keys = get_column_keys(columns)
+        escape_table = HTML_ESCAPE_TABLE
 
-        for row in data:
-            cells = []
+        def build_row(row):
             if isinstance(row, dict):
-                for col in columns:
-                    if isinstance(col, dict):
-                        value = row.get(col.get("fieldname", ""), "")
-                    else:
-                        value = row.get(col, "")
-                    cells.append("<td>{}</td>".format(frappe.utils.escape_html(str(value) if value else "")))
+                values = (row.get(key, "") for key in col_keys)
             elif isinstance(row, (list, tuple)):
-                for value in row:
-                    cells.append("<td>{}</td>".format(frappe.utils.escape_html(str(value) if value else "")))
+                values = row
+            else:
+                values = ()
+            cells = "".join(f"<td>{str(value).translate(escape_table) if value else ''}</td>" for value in values)
+            return f"<tr>{cells}</tr>"
+
+        return "".join(build_row(row) for row in data)
+
+
+def get_column_labels(columns):
+    """Header labels for report columns (dicts or plain names)"""
+    return [
+        col.get("label", col.get("fieldname", "")) if isinstance(col, dict) else str(col)
+        for col in columns
+    ]
+
+
+def get_column_keys(columns):
+    """Keys used to read each column from dict rows"""
+    return [col.get("fieldname", "") if isinstance(col, dict) else col for col in columns]
 
-            rows_html.append("<tr>{}</tr>".format("".join(cells)))
 
-        return "".join(rows_html)
+def make_row_getter(col_keys):
+    """
+    Build a function that reads col_keys from a dict row as a tuple
+
+    Uses operator.itemgetter (one C-level call per row); rows missing one of
+    the keys fall back to dict.get with "" as the default.
+    """
+    if not col_keys:
+        return lambda row: ()
+
+    getter = itemgetter(*col_keys)
+    if len(col_keys) == 1:
+        # itemgetter with a single key returns the bare value
+        single_getter = getter
+        getter = lambda row: (single_getter(row),)
+
+    def get_values(row):
+        try:
+            return getter(row)
+        except KeyError:
+            return tuple(row.get(key, "") for key in col_keys)
+
+    return get_values
+
+
+def encode_attachment(data):
+    """Base64-encode attachment bytes for the Evolution API media payload"""
+    import base64
+
+    return base64.b64encode(data).decode("utf-8")
 
 
 def send_report_with_attachment(phone, message, attachments, report_name):
     """Send report with attachment via WhatsApp"""
-    import base64
-    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
+    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_api_key, get_settings
     from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
     from whatsapp_notifications.whatsapp_notifications.api import make_http_request
 
@@ -571,82 +652,237 @@ def send_report_with_attachment(phone, message, attachments, report_name):
     if not formatted_phone:
         return {"success": False, "error": "Invalid phone number"}
 
-    results = []
+    return post_report_messages(formatted_phone, message, attachments, settings, get_api_key(), make_http_request)
 
-    # Send text message first
-    try:
-        url = "{}/message/sendText/{}".format(
-            settings.get("api_url"),
-            settings.get("instance_name")
-        )
 
-        headers = {
-            "Content-Type": "application/json; charset=utf-8",
-            "apikey": settings.get("api_key")
-        }
+def send_report_to_recipients(recipients, message, attachments, max_workers=8):
+    """
+    Send a report with attachments to several recipients concurrently
 
-        payload = {
-            "number": formatted_phone,
-            "text": message
-        }
+    Settings, the API key and phone formatting are resolved on the calling
+    thread; the worker threads only make the HTTP calls.
 
-        response = make_http_request(url, method="POST", headers=headers, data=payload)
-        results.append({"type": "text", "success": True})
+    Args:
+        recipients: List of phone numbers
+        message: Message text
+        attachments: List of attachment dicts (type, b64, filename)
+        max_workers: Maximum number of concurrent HTTP calls
 
-    except Exception as e:
-        results.append({"type": "text", "success": False, "error": str(e)})
+    Returns:
+        list: (phone, result) tuples in recipient order
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_api_key, get_settings
+    from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
+    from whatsapp_notifications.whatsapp_notifications.api import make_requests_call
 
-    # Send attachments
-    for attachment in attachments:
+    settings = get_settings()
+
+    if not settings.get("enabled"):
+        return [(phone, {"success": False, "error": "WhatsApp notifications disabled"}) for phone in recipients]
+
+    api_key = get_api_key()
+    results = [None] * len(recipients)
+    to_send = []
+
+    for index, phone in enumerate(recipients):
         try:
-            media_base64 = base64.b64encode(attachment["data"]).decode("utf-8")
+            formatted_phone = format_phone_number(phone)
+        except Exception as e:
+            results[index] = {"success": False, "error": str(e)}
+            continue
 
-            if attachment["type"] == "excel":
-                mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            elif attachment["type"] == "pdf":
-                mimetype = "application/pdf"
-            else:
-                mimetype = "application/octet-stream"
+        if formatted_phone:
+            to_send.append((index, formatted_phone))
+        else:
+            results[index] = {"success": False, "error": "Invalid phone number"}
+
+    if to_send:
+        # Every recipient gets its text before its attachments, so the texts
+        # all go out concurrently first, then all the attachments
+        headers = get_report_headers(api_key)
+        messages = {index: get_report_messages(formatted_phone, message, attachments, settings)
+                    for index, formatted_phone in to_send}
+        text_jobs = [(index, messages[index][0]) for index, formatted_phone in to_send]
+        media_jobs = [(index, item) for index, formatted_phone in to_send for item in messages[index][1:]]
+        sent = {index: [] for index, formatted_phone in to_send}
+
+        def post(job):
+            return post_report_message(make_requests_call, headers, job[1])
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, max(len(text_jobs), len(media_jobs)))) as executor:
+            for jobs in (text_jobs, media_jobs):
+                for (index, item), result in zip(jobs, executor.map(post, jobs)):
+                    sent[index].append(result)
+
+        for index, message_results in sent.items():
+            results[index] = get_report_result(message_results)
+
+    return list(zip(recipients, results))
+
+
+def post_report_messages(formatted_phone, message, attachments, settings, api_key, request):
+    """
+    Post the report text and then its attachments to one recipient
+
+    Args:
+        formatted_phone: Already formatted phone number
+        message: Message text
+        attachments: List of attachment dicts (type, filename and either
+            b64, the base64 content, or data, the raw bytes)
+        settings: Settings dict from get_settings
+        api_key: Evolution API key
+        request: HTTP function with the make_http_request signature
+
+    Returns:
+        dict: Result with success status and per-message results
+    """
+    headers = get_report_headers(api_key)
+    return get_report_result([
+        post_report_message(request, headers, item)
+        for item in get_report_messages(formatted_phone, message, attachments, settings)
+    ])
+
+
+def get_report_headers(api_key):
+    """Headers shared by every Evolution API call of a report send"""
+    return {
+        "Content-Type": "application/json; charset=utf-8",
+        "apikey": api_key
+    }
+
+
+def get_report_messages(formatted_phone, message, attachments, settings):
+    """
+    Build the Evolution API calls for one recipient, text first
+
+    Args:
+        formatted_phone: Already formatted phone number
+        message: Message text
+        attachments: List of attachment dicts (see post_report_messages)
+        settings: Settings dict from get_settings
+
+    Returns:
+        list: (type, url, payload) tuples
+    """
+    api_url = settings.get("api_url")
+    instance_name = settings.get("instance_name")
+    media_url = "{}/message/sendMedia/{}".format(api_url, instance_name)
+
+    messages = [("text", "{}/message/sendText/{}".format(api_url, instance_name), {
+        "number": formatted_phone,
+        "text": message
+    })]
 
-            url = "{}/message/sendMedia/{}".format(
-                settings.get("api_url"),
-                settings.get("instance_name")
-            )
+    for attachment in attachments:
+        messages.append((attachment["type"], media_url, {
+            "number": formatted_phone,
+            "mediatype": "document",
+            "mimetype": ATTACHMENT_MIMETYPES.get(attachment["type"], "application/octet-stream"),
+            "caption": "",
+            # Encoded once by generate_and_send and shared by every recipient
+            "media": attachment.get("b64") or encode_attachment(attachment["data"]),
+            "fileName": attachment["filename"]
+        }))
 
-            payload = {
-                "number": formatted_phone,
-                "mediatype": "document",
-                "mimetype": mimetype,
-                "caption": "",
-                "media": media_base64,
-                "fileName": attachment["filename"]
-            }
+    return messages
 
-            response = make_http_request(url, method="POST", headers=headers, data=payload)
-            results.append({"type": attachment["type"], "success": True})
 
-        except Exception as e:
-            results.append({"type": attachment["type"], "success": False, "error": str(e)})
+def post_report_message(request, headers, item):
+    """
+    Post one (type, url, payload) call from get_report_messages
+
+    Only makes the HTTP call through `request`, so it can run on a worker
+    thread when given make_requests_call.
+
+    Returns:
+        dict: type, success and error (on failure)
+    """
+    message_type, url, payload = item
+    try:
+        request(url, method="POST", headers=headers, data=payload)
+        return {"type": message_type, "success": True}
+    except Exception as e:
+        return {"type": message_type, "success": False, "error": str(e)}
+
 
-    # Return success if at least text was sent
+def get_report_result(results):
+    """Combine per-message results; a send succeeds if any message went out"""
     success = any(r.get("success") for r in results)
     return {"success": success, "results": results}
 
 
+def report_should_send_today(report):
+    """
+    Check if a report is scheduled for today
+
+    Args:
+        report: WhatsApp Auto Report document or row with the schedule fields
+    """
+    today_date = getdate(today())
+
+    if report.frequency == "Daily":
+        return True
+
+    elif report.frequency == "Weekly":
+        return DAY_NAMES[today_date.weekday()] == report.day_of_week
+
+    elif report.frequency == "Monthly":
+        return today_date.day == report.day_of_month
+
+    elif report.frequency == "Quarterly":
+        return today_date.month in QUARTER_MONTHS and today_date.day == report.day_of_month
+
+    return False
+
+
+def report_is_time_to_send(report):
+    """
+    Check if it's time to send a report (within 30 min window)
+
+    Args:
+        report: WhatsApp Auto Report document or row with send_time
+    """
+    if not report.send_time:
+        return False
+
+    now = now_datetime()
+    send_time = get_datetime("{} {}".format(today(), report.send_time))
+
+    # Check if we're within 30 minutes after send_time
+    diff_minutes = (now - send_time).total_seconds() / 60
+
+    return 0 <= diff_minutes <= 30
+
+
+def report_was_sent_today(report):
+    """
+    Check if a report was already sent today
+
+    Args:
+        report: WhatsApp Auto Report document or row with last_sent
+    """
+    if not report.last_sent:
+        return False
+
+    return getdate(report.last_sent) == getdate(today())
+
+
 def process_auto_reports():
     """Process all due auto reports - called by scheduler"""
+    # Only the schedule columns; the worker loads the full document when sending
     reports = frappe.get_all(
         "WhatsApp Auto Report",
         filters={"enabled": 1},
-        pluck="name"
+        fields=["name", "frequency", "day_of_week", "day_of_month", "send_time", "last_sent"]
     )
 
-    for report_name in reports:
+    for report in reports:
+        report_name = report.name
         try:
-            report = frappe.get_doc("WhatsApp Auto Report", report_name)
-
-            # Check if should send today and at this time
-            if report.should_send_today() and report.is_time_to_send() and not report.was_sent_today():
+            # Cheapest and most selective check first: the send window is
+            # only 30 minutes a day, so most ticks stop at the first test
+            if report_is_time_to_send(report) and not report_was_sent_today(report) and report_should_send_today(report):
                 frappe.enqueue(
                     "whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_auto_report.whatsapp_auto_report.send_auto_report",
                     report_name=report_name,
@@ -0,0 +1,35 @@
+# Copyright (c) 2024, Entretech and contributors
+# For license information, please see license.txt
+
+import unittest
+
+import frappe
+
+from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import (
+    claim_message_log,
+    create_message_log,
+)
+
+
+class TestWhatsAppMessageLog(unittest.TestCase):
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_claim_then_mark_sent(self):
+        log = create_message_log(phone="258841234567", message="Test", formatted_phone="258841234567")
+
+        claimed_at = claim_message_log(log.name)
+        self.assertTrue(claimed_at)
+        log.status = "Sending"
+        log.modified = claimed_at
+
+        # A second claim of the same log loses
+        self.assertIsNone(claim_message_log(log.name))
+
+        log.mark_sent(response_data={"key": {"id": "ABC"}}, response_id="ABC")
+
+        status, response_id = frappe.db.get_value(
+            "WhatsApp Message Log", log.name, ["status", "response_id"]
+        )
+        self.assertEqual(status, "Sent")
+        self.assertEqual(response_id, "ABC")
@@ -6,6 +6,23 @@ from frappe.model.document import Document
 from frappe import _
 import json
 
+# Final statuses that cleanup_old_logs may delete
+CLEANUP_STATUSES = ("Sent", "Delivered", "Read", "Cancelled", "Failed")
+
+# Rows removed per DELETE statement by cleanup_old_logs
+CLEANUP_BATCH_SIZE = 10000
+
+# Dashboard stats are polled; serve them from Redis for this long
+STATS_CACHE_SECONDS = 60
+
+# Columns written by create_message_logs_bulk
+BULK_INSERT_FIELDS = (
+    "name", "creation", "modified", "owner", "modified_by", "docstatus",
+    "phone", "formatted_phone", "message", "reference_doctype", "reference_name",
+    "notification_rule", "recipient_name", "scheduled_time", "status", "message_type",
+    "media_type", "file_name", "file_size", "caption", "retry_count"
+)
+
 
 class WhatsAppMessageLog(Document):
     """
@@ -56,6 +73,9 @@ class WhatsAppMessageLog(Document):
         
         return {"success": True, "message": _("Message cancelled")}
     
+    # mark_sent / mark_failed write with db_set: the log was usually claimed
+    # with a raw UPDATE (claim_message_log), so a save() could trip the
+    # stale-document check after the message has already gone out
     def mark_sent(self, response_data=None, response_id=None):
         """
         Mark message as sent
@@ -64,16 +84,18 @@ class WhatsAppMessageLog(Document):
             response_data: API response data
             response_id: Message ID from API
         """
-        self.status = "Sent"
-        self.sent_at = frappe.utils.now_datetime()
+        values = {
+            "status": "Sent",
+            "sent_at": frappe.utils.now_datetime()
+        }
         
         if response_data:
-            self.response_data = json.dumps(response_data) if isinstance(response_data, dict) else str(response_data)
+            values["response_data"] = json.dumps(response_data) if isinstance(response_data, dict) else str(response_data)
         
         if response_id:
-            self.response_id = response_id
+            values["response_id"] = response_id
         
-        self.save(ignore_permissions=True)
+        self.db_set(values)
     
     def mark_failed(self, error_message):
         """
@@ -82,18 +104,21 @@ class WhatsAppMessageLog(Document):
         Args:
             error_message: Error description
         """
-        self.status = "Failed"
-        self.error_message = str(error_message)[:500]  # Limit length
-        self.save(ignore_permissions=True)
+        self.db_set({
+            "status": "Failed",
+            "error_message": str(error_message)[:500]  # Limit length
+        })
 
 
 def create_message_log(phone, message, reference_doctype=None, reference_name=None,
                        notification_rule=None, recipient_name=None, formatted_phone=None,
                        scheduled_time=None, message_type=None, media_type=None,
-                       file_name=None, file_size=None, caption=None):
+                       file_name=None, file_size=None, caption=None, name=None):
     """
     Create a new message log entry
 
+    Nothing is committed here; the log is saved with the caller's transaction.
+
     Args:
         phone: Original phone number
         message: Message content
@@ -108,6 +133,7 @@ def create_message_log(phone, message, reference_doctype=None, reference_name=No
         file_name: Name of the file being sent
         file_size: Size of file in bytes
         caption: Caption for media messages
+        name: Pre-allocated log name (optional, from reserve_series_names)
 
     Returns:
         WhatsApp Message Log document
@@ -137,15 +163,130 @@ def create_message_log(phone, message, reference_doctype=None, reference_name=No
         "caption": caption
     })
 
-    log.insert(ignore_permissions=True)
-    frappe.db.commit()
+    log.insert(ignore_permissions=True, set_name=name)
 
     return log
 
 
+def create_message_logs_bulk(rows):
+    """
+    Insert several message logs with one naming update and one INSERT
+
+    Mirrors create_message_log and before_insert since bulk rows skip the
+    document lifecycle. A single row goes through create_message_log.
+
+    Args:
+        rows: List of dicts with create_message_log keyword arguments
+
+    Returns:
+        list: WhatsApp Message Log names, in the order of rows
+    """
+    from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number, reserve_series_names
+
+    if not rows:
+        return []
+
+    if len(rows) == 1:
+        return [create_message_log(**rows[0]).name]
+
+    now = frappe.utils.now_datetime()
+    user = frappe.session.user
+    names = reserve_series_names("WAMSG-", len(rows))
+
+    values = []
+    for name, row in zip(names, rows):
+        scheduled_time = row.get("scheduled_time")
+        values.append((
+            name, now, now, user, user, 0,
+            row.get("phone"),
+            row.get("formatted_phone") or format_phone_number(row.get("phone")),
+            row.get("message"),
+            row.get("reference_doctype"),
+            row.get("reference_name"),
+            row.get("notification_rule"),
+            row.get("recipient_name"),
+            scheduled_time,
+            "Queued" if scheduled_time else "Pending",
+            row.get("message_type") or "Text",
+            row.get("media_type"),
+            row.get("file_name"),
+            row.get("file_size"),
+            row.get("caption"),
+            0
+        ))
+
+    frappe.db.bulk_insert("WhatsApp Message Log", fields=BULK_INSERT_FIELDS, values=values)
+
+    return names
+
+
+def on_doctype_update():
+    """Composite indexes for the scheduler, cleanup, stats and send-once lookups"""
+    # process_pending_messages / stale Pending recovery
+    frappe.db.add_index("WhatsApp Message Log", ["status", "scheduled_time", "creation"])
+    # retry_failed_messages
+    frappe.db.add_index("WhatsApp Message Log", ["status", "retry_count", "modified"])
+    # cleanup_old_logs and get_message_stats
+    frappe.db.add_index("WhatsApp Message Log", ["creation", "status"])
+    # Send-once checks of notification rules
+    frappe.db.add_index("WhatsApp Message Log", ["reference_doctype", "reference_name", "notification_rule", "status"])
+
+
+def claim_message_log(log_name):
+    """
+    Atomically move a Pending/Queued log to Sending
+
+    The conditional UPDATE is the lease: only one of the scheduler, a queued
+    job or a recovery pass can claim a log, so it is never sent twice. The
+    claim's modified timestamp is what retry_failed_messages uses to recover
+    logs stuck in Sending.
+
+    Args:
+        log_name: WhatsApp Message Log document name
+
+    Returns:
+        datetime or None: The claim's modified timestamp if this caller
+            claimed the log (copy it onto a loaded document), else None
+    """
+    claimed_at = frappe.utils.now_datetime()
+
+    frappe.db.sql("""
+        UPDATE `tabWhatsApp Message Log`
+        SET status = 'Sending', modified = %s
+        WHERE name = %s AND status IN ('Pending', 'Queued')
+    """, (claimed_at, log_name))
+
+    if frappe.db._cursor.rowcount != 1:
+        return None
+
+    return claimed_at
+
+
+def enqueue_message_log(log_name, message_type=None):
+    """
+    Send a log from a background job once the current transaction commits
+
+    Used when queue_enabled is set, instead of waiting for the next
+    process_pending_messages run (which stays as the fallback).
+
+    Args:
+        log_name: WhatsApp Message Log document name
+        message_type: Log message type (Text, Media, Document)
+    """
+    if message_type in ("Media", "Document"):
+        method = "whatsapp_notifications.whatsapp_notifications.api.process_media_message_log"
+    else:
+        method = "whatsapp_notifications.whatsapp_notifications.api.process_message_log"
+
+    frappe.enqueue(method, queue="short", log_name=log_name, enqueue_after_commit=True)
+
+
 def get_pending_messages(limit=50):
     """
     Get pending messages ready to be sent
+
+    Fallback for logs whose job was lost and for scheduled messages; queued
+    logs are normally sent by the job from enqueue_message_log.
     
     Args:
         limit: Maximum number of messages to return
@@ -216,27 +357,25 @@ def cleanup_old_logs(days=30):
         return 0
     
     cutoff = frappe.utils.add_to_date(frappe.utils.now_datetime(), days=-days)
-    
-    old_logs = frappe.get_all(
-        "WhatsApp Message Log",
-        filters={
-            "creation": ["<", cutoff],
-            "status": ["in", ["Sent", "Delivered", "Read", "Cancelled", "Failed"]]
-        },
-        pluck="name"
-    )
-    
-    for log_name in old_logs:
-        frappe.delete_doc("WhatsApp Message Log", log_name, ignore_permissions=True)
-    
-    if old_logs:
-        frappe.db.commit()
-    
-    
-    if old_logs:
+    deleted = 0
+
+    # Set-based deletes in batches, committing between them to keep each
+    # transaction short. Logs have no child tables or delete hooks.
+    while True:
+        frappe.db.sql("""
+            DELETE FROM `tabWhatsApp Message Log`
+            WHERE creation < %s AND status IN %s
+            ORDER BY creation
+            LIMIT %s
+        """, (cutoff, CLEANUP_STATUSES, CLEANUP_BATCH_SIZE))
+        count = frappe.db._cursor.rowcount
         frappe.db.commit()
-    
-    return len(old_logs)
+
+        deleted += count
+        if count < CLEANUP_BATCH_SIZE:
+            break
+
+    return deleted
 
 
 @frappe.whitelist()
@@ -247,15 +386,28 @@ def clear_all_logs():
     if not frappe.session.user == "Administrator" and "System Manager" not in frappe.get_roles():
         frappe.throw(_("Not permitted"))
         
-    frappe.db.sql("TRUNCATE `tabWhatsApp Message Log`")
+    truncate_message_logs()
     return True
 
 
+def truncate_message_logs():
+    """
+    Empty the message log table, and any child tables of it, with TRUNCATE
+
+    No per-row hooks run. The cached dashboard stats are dropped as well.
+    """
+    for df in frappe.get_meta("WhatsApp Message Log").get_table_fields():
+        frappe.db.sql("TRUNCATE `tab{}`".format(df.options))
+
+    frappe.db.sql("TRUNCATE `tabWhatsApp Message Log`")
+    frappe.cache().delete_keys("whatsapp_message_stats_")
+
+
 
 @frappe.whitelist()
 def get_message_stats(days=7):
     """
-    Get message statistics for dashboard
+    Get message statistics for dashboard (cached for a minute per period)
     
     Args:
         days: Number of days to include
@@ -263,34 +415,33 @@ def get_message_stats(days=7):
     Returns:
         dict: Statistics
     """
+    days = frappe.utils.cint(days)
+    cache_key = "whatsapp_message_stats_{}".format(days)
+    result = frappe.cache().get_value(cache_key)
+
+    if result is None:
+        result = get_message_stats_uncached(days)
+        frappe.cache().set_value(cache_key, result, expires_in_sec=STATS_CACHE_SECONDS)
+
+    return result
+
+
+def get_message_stats_uncached(days):
+    """Count logs per status since `days` ago and bucket them for the dashboard"""
     cutoff = frappe.utils.add_to_date(frappe.utils.nowdate(), days=-days)
-    
-    stats = frappe.db.sql("""
-        SELECT 
-            status,
-            COUNT(*) as count
+
+    # One grouped scan of the (creation, status) index; at most one row per status
+    by_status = dict(frappe.db.sql("""
+        SELECT status, COUNT(*)
         FROM `tabWhatsApp Message Log`
         WHERE creation >= %s
         GROUP BY status
-    """, cutoff, as_dict=True)
-    
-    result = {
-        "total": 0,
-        "sent": 0,
-        "failed": 0,
-        "pending": 0,
-        "by_status": {}
+    """, cutoff))
+
+    return {
+        "total": sum(by_status.values()),
+        "sent": sum(by_status.get(status, 0) for status in ("Sent", "Delivered", "Read")),
+        "failed": by_status.get("Failed", 0),
+        "pending": sum(by_status.get(status, 0) for status in ("Pending", "Queued")),
+        "by_status": by_status
     }
-    
-    for row in stats:
-        result["by_status"][row.status] = row.count
-        result["total"] += row.count
-        
-        if row.status in ("Sent", "Delivered", "Read"):
-            result["sent"] += row.count
-        elif row.status == "Failed":
-            result["failed"] += row.count
-        elif row.status in ("Pending", "Queued"):
-            result["pending"] += row.count
-    
-    return result
@@ -1,18 +1,33 @@
 """
 WhatsApp Notification Rule - Defines when and how to send WhatsApp notifications
 """
+import datetime
 import re
 import frappe
 from frappe.model.document import Document
 from frappe import _
 
+from whatsapp_notifications.whatsapp_notifications.utils import render_cached_template
+
 _METADATA_FIELDS = frozenset({
     "name", "idx", "modified", "creation", "modified_by", "owner",
     "docstatus", "parent", "parentfield", "parenttype", "doctype"
 })
 
+# Active hours as HH:MM or HH:MM:SS
+_TIME_RE = re.compile(r'^([01]?[0-9]|2[0-3]):([0-5][0-9])(:[0-5][0-9])?$')
+
+# Log statuses that count as "already sent" for send-once rules
+SEND_ONCE_STATUSES = ("Sent", "Pending")
+
+# How long get_rules_for_doctype keeps the rules of a doctype/event in Redis
+RULES_CACHE_SECONDS = 300
+
 
 class WhatsAppNotificationRule(Document):
+    # (start, end) times parsed by get_active_hours, memoized per instance
+    _active_hours = None
+
     def validate(self):
         self.validate_document_type()
         self.validate_phone_field()
@@ -149,6 +164,8 @@ class WhatsAppNotificationRule(Document):
         return False
 
     def validate_time_settings(self):
+        self._active_hours = None
+
         if not self.enable_active_hours:
             self.active_hours_start = None
             self.active_hours_end = None
@@ -157,12 +174,10 @@ class WhatsAppNotificationRule(Document):
         if not self.active_hours_start or not self.active_hours_end:
             frappe.throw(_("Both Active Hours Start and End must be set when 'Restrict to Active Hours' is enabled"))
 
-        time_pattern = re.compile(r'^([01]?[0-9]|2[0-3]):([0-5][0-9])(:[0-5][0-9])?$')
-
-        if not time_pattern.match(self.active_hours_start):
+        if not _TIME_RE.match(self.active_hours_start):
             frappe.throw(_("Active Hours Start must be in HH:MM format (e.g., 09:00)"))
 
-        if not time_pattern.match(self.active_hours_end):
+        if not _TIME_RE.match(self.active_hours_end):
             frappe.throw(_("Active Hours End must be in HH:MM format (e.g., 18:00)"))
 
         if len(self.active_hours_start) == 5:
@@ -176,7 +191,7 @@ class WhatsAppNotificationRule(Document):
     def on_trash(self):
         clear_rules_cache()
 
-    def is_applicable(self, doc, event):
+    def is_applicable(self, doc, event, sent_rules=None):
         if not self.enabled:
             return False
 
@@ -198,9 +213,11 @@ class WhatsAppNotificationRule(Document):
             return False
 
         if self.condition:
+            # Conditions, row conditions and messages are compiled once per
+            # request or job (render_cached_template keeps them on frappe.local)
             try:
                 context = get_template_context(doc)
-                result = frappe.render_template(self.condition, context)
+                result = render_cached_template(self.condition, context)
                 if isinstance(result, str):
                     result = result.strip().lower() not in ("", "false", "0", "none", "null")
                 if not result:
@@ -221,34 +238,43 @@ class WhatsAppNotificationRule(Document):
             return False
 
         if self.send_once:
-            if has_sent_for_rule(self.name, doc.doctype, doc.name):
+            # sent_rules: result of get_already_sent_rules, when the caller batched the check
+            if sent_rules is not None:
+                if self.name in sent_rules:
+                    return False
+            elif has_sent_for_rule(self.name, doc.doctype, doc.name):
                 return False
 
         return True
 
     def is_within_active_hours(self):
         from frappe.utils import now_datetime
-        import datetime
 
         if not self.enable_active_hours:
             return True
 
-        if not self.active_hours_start or not self.active_hours_end:
+        hours = self.get_active_hours()
+        if not hours:
             return True
 
-        try:
-            start_parts = self.active_hours_start.split(":")
-            end_parts = self.active_hours_end.split(":")
-            start = datetime.time(int(start_parts[0]), int(start_parts[1]))
-            end = datetime.time(int(end_parts[0]), int(end_parts[1]))
-            now = now_datetime().time()
-
-            if start <= end:
-                return start <= now <= end
-            else:
-                return now >= start or now <= end
-        except (ValueError, IndexError, AttributeError):
-            return True
+        start, end = hours
+        now = now_datetime().time()
+
+        if start <= end:
+            return start <= now <= end
+        else:
+            return now >= start or now <= end
+
+    def get_active_hours(self):
+        """
+        Active hours as a (start, end) pair of datetime.time, parsed once per instance
+
+        Returns an empty tuple when the hours are missing or cannot be parsed,
+        in which case the rule is not restricted.
+        """
+        if self._active_hours is None:
+            self._active_hours = _parse_active_hours(self.active_hours_start, self.active_hours_end)
+        return self._active_hours
 
     def get_recipients(self, doc):
         recipients = []
@@ -340,7 +366,7 @@ class WhatsAppNotificationRule(Document):
                 context["changed_values"] = {f: getattr(row, f, None) for f in changed_fields}
                 context["previous_values"] = {f: getattr(prev_row, f, None) for f in changed_fields} if prev_row else {}
                 context["row_before"] = prev_row
-                res = frappe.render_template(self.row_condition, context)
+                res = render_cached_template(self.row_condition, context)
                 if isinstance(res, str):
                     res = res.strip().lower() not in ("", "false", "0", "none", "null")
                 if res:
@@ -369,7 +395,7 @@ class WhatsAppNotificationRule(Document):
             context["changed_values"] = {f: getattr(row, f, None) for f in cf} if row else {}
             context["previous_values"] = {f: getattr(row_before, f, None) for f in cf} if row_before else {}
             context["row_before"] = row_before
-            return frappe.render_template(template, context)
+            return render_cached_template(template, context) if template else ""
         except Exception as e:
             frappe.log_error(
                 "Template render error ({}): {}".format(self.rule_name, str(e)),
@@ -378,6 +404,21 @@ class WhatsAppNotificationRule(Document):
             return None
 
 
+def _parse_active_hours(start, end):
+    if not start or not end:
+        return ()
+
+    try:
+        start_parts = start.split(":")
+        end_parts = end.split(":")
+        return (
+            datetime.time(int(start_parts[0]), int(start_parts[1])),
+            datetime.time(int(end_parts[0]), int(end_parts[1]))
+        )
+    except (ValueError, IndexError, AttributeError):
+        return ()
+
+
 def _is_template_syntax_error(exc):
     """
     Returns True only if the exception is a genuine Jinja2 template syntax/parse error
@@ -549,6 +590,8 @@ def get_rules_for_doctype(doctype, event):
             "on_same_day": "On Same Day",
         }
 
+        # Whole rows in one query (the rule has no child tables); cleared
+        # by clear_rules_cache whenever a rule is saved or deleted
         rules = frappe.get_all(
             "WhatsApp Notification Rule",
             filters={
@@ -556,12 +599,13 @@ def get_rules_for_doctype(doctype, event):
                 "document_type": doctype,
                 "event": event_map.get(event, event)
             },
-            pluck="name"
+            fields=["*"]
         )
 
-        frappe.cache().set_value(cache_key, rules, expires_in_sec=60)
+        frappe.cache().set_value(cache_key, rules, expires_in_sec=RULES_CACHE_SECONDS)
 
-    return [frappe.get_doc("WhatsApp Notification Rule", r) for r in rules]
+    # Documents built from the cached rows, without touching the database
+    return [frappe.get_doc(dict(rule, doctype="WhatsApp Notification Rule")) for rule in rules]
 
 
 def has_sent_for_rule(rule_name, doctype, docname):
@@ -569,10 +613,33 @@ def has_sent_for_rule(rule_name, doctype, docname):
         "notification_rule": rule_name,
         "reference_doctype": doctype,
         "reference_name": docname,
-        "status": ["in", ["Sent", "Pending"]]
+        "status": ["in", SEND_ONCE_STATUSES]
     })
 
 
+def get_already_sent_rules(doctype, docname, rule_names):
+    """
+    Batched has_sent_for_rule: which of the given rules already sent for a document
+
+    Args:
+        doctype: Document type
+        docname: Document name
+        rule_names: Notification rule names to check
+
+    Returns:
+        set: Names of the rules that already have a Sent/Pending log
+    """
+    if not rule_names:
+        return set()
+
+    return set(frappe.db.sql_list("""
+        SELECT DISTINCT notification_rule
+        FROM `tabWhatsApp Message Log`
+        WHERE reference_doctype = %s AND reference_name = %s
+        AND status IN %s AND notification_rule IN %s
+    """, (doctype, docname, SEND_ONCE_STATUSES, tuple(rule_names))))
+
+
 def clear_rules_cache():
     frappe.cache().delete_keys("whatsapp_rules_*")
 
@@ -111,7 +111,10 @@ def process_event(doc, event):
         return
 
     from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_notification_rule.whatsapp_notification_rule import get_rules_for_doctype
+    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_notification_rule.whatsapp_notification_rule import (
+        get_already_sent_rules,
+        get_rules_for_doctype,
+    )
 
     try:
         # Quick check if enabled
@@ -134,12 +137,17 @@ def process_event(doc, event):
         if not rules:
             return
 
+        # One query for the send-once check of every rule
+        sent_rules = get_already_sent_rules(
+            doc.doctype, doc.name, [rule.name for rule in rules if rule.send_once]
+        )
+
         # Process each rule
         for rule in rules:
             try:
                 # Debug: check if rule is applicable
                 if settings.get("enable_debug_logging"):
-                    is_applicable = rule.is_applicable(doc, event)
+                    is_applicable = rule.is_applicable(doc, event, sent_rules)
                     frappe.log_error(
                         "Rule: {} | Applicable: {} | Doc: {}".format(
                             rule.name, is_applicable, doc.name
@@ -147,7 +155,7 @@ def process_event(doc, event):
                         "WhatsApp Rule Debug"
                     )
 
-                process_rule(doc, rule, settings)
+                process_rule(doc, rule, settings, sent_rules)
             except Exception as e:
                 frappe.log_error(
                     "WhatsApp Rule Error ({} on {}): {}".format(
@@ -166,7 +174,7 @@ def process_event(doc, event):
         )
 
 
-def process_rule(doc, rule, settings):
+def process_rule(doc, rule, settings, sent_rules=None):
     """
     Process a single notification rule for a document
 
@@ -174,6 +182,7 @@ def process_rule(doc, rule, settings):
         doc: The document
         rule: WhatsApp Notification Rule document
         settings: Evolution API Settings dict
+        sent_rules: Rules already sent for doc, from get_already_sent_rules (optional)
     """
     from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
 
@@ -190,7 +199,7 @@ def process_rule(doc, rule, settings):
         )
 
     # Check if rule is applicable
-    if not rule.is_applicable(doc, get_event_name(rule.event)):
+    if not rule.is_applicable(doc, get_event_name(rule.event), sent_rules):
         if settings.get("enable_debug_logging"):
             frappe.log_error(
                 "Rule {} not applicable for doc {}".format(rule.name, doc.name),
@@ -228,28 +237,48 @@ def process_rule(doc, rule, settings):
             seconds=rule.delay_seconds
         )
 
-    # Send to all recipients
+    # Collect (phone or group, message, recipient name) for every target
+    targets = []
     for recipient in recipients:
-        try:
-            # Handle both new format (dict) and legacy format (string)
-            if isinstance(recipient, dict):
-                phone_or_group = recipient["value"]
-                recipient_type = recipient["type"]
-            else:
-                # Legacy format (string)
-                phone_or_group = recipient
-                recipient_type = "phone"
+        # Handle both new format (dict) and legacy format (string)
+        if isinstance(recipient, dict):
+            phone_or_group = recipient["value"]
+            recipient_type = recipient["type"]
+        else:
+            # Legacy format (string)
+            phone_or_group = recipient
+            recipient_type = "phone"
 
-            # Get recipient name if available (only for phone recipients)
-            if recipient_type == "phone":
-                recipient_name = get_recipient_name(doc, rule.phone_field)
-            else:
-                # For groups, use the group name from the rule
-                recipient_name = rule.group_name or "Group"
+        # Get recipient name if available (only for phone recipients)
+        if recipient_type == "phone":
+            recipient_name = get_recipient_name(doc, rule.phone_field)
+        else:
+            # For groups, use the group name from the rule
+            recipient_name = rule.group_name or "Group"
 
+        targets.append((phone_or_group, message, recipient_name))
+
+    # Send to owner/default notification numbers if configured
+    if rule.notify_owner and settings.get("owner_number"):
+        owner_message = rule.render_message(doc, for_owner=True)
+
+        # Support multiple numbers (one per line)
+        owner_numbers = settings.get("owner_number", "").strip().split("\n")
+        for owner_num in owner_numbers:
+            owner_num = owner_num.strip()
+            if owner_num:
+                targets.append((owner_num, owner_message, "Default Notification"))
+
+    if message_type == "Text Only":
+        # One INSERT for all recipients of the rule
+        send_text_notifications(doc, rule, targets, scheduled_time, settings)
+        return
+
+    for phone_or_group, target_message, recipient_name in targets:
+        try:
             send_notification(
                 phone=phone_or_group,
-                message=message,
+                message=target_message,
                 reference_doctype=doc.doctype,
                 reference_name=doc.name,
                 notification_rule=rule.name,
@@ -266,35 +295,69 @@ def process_rule(doc, rule, settings):
                 "WhatsApp Send Error"
             )
 
-    # Send to owner/default notification numbers if configured
-    if rule.notify_owner and settings.get("owner_number"):
-        owner_message = rule.render_message(doc, for_owner=True)
 
-        # Support multiple numbers (one per line)
-        owner_numbers = settings.get("owner_number", "").strip().split("\n")
-        for owner_num in owner_numbers:
-            owner_num = owner_num.strip()
-            if not owner_num:
-                continue
-            try:
-                send_notification(
-                    phone=owner_num,
-                    message=owner_message,
-                    reference_doctype=doc.doctype,
-                    reference_name=doc.name,
-                    notification_rule=rule.name,
-                    recipient_name="Default Notification",
-                    scheduled_time=scheduled_time,
-                    settings=settings,
-                    message_type=message_type,
-                    print_format=getattr(rule, 'print_format', None),
-                    fixed_file_url=getattr(rule, 'fixed_file', None)
-                )
-            except Exception as e:
+def send_text_notifications(doc, rule, targets, scheduled_time, settings):
+    """
+    Create the text message logs of a rule with one INSERT, then send them
+
+    Args:
+        doc: The document
+        rule: WhatsApp Notification Rule document
+        targets: List of (phone or group ID, message, recipient name) tuples
+        scheduled_time: When to send (None = immediate)
+        settings: API settings dict
+    """
+    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_logs_bulk, enqueue_message_log
+    from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
+    from whatsapp_notifications.whatsapp_notifications.api import process_message_logs
+
+    rows = []
+    for phone, message, recipient_name in targets:
+        # Format phone number (skip for group IDs)
+        if is_group_id(phone):
+            formatted_phone = phone  # Use group ID as-is
+        else:
+            formatted_phone = format_phone_number(phone)
+
+            if not formatted_phone:
                 frappe.log_error(
-                    "WhatsApp Owner Send Error ({} to {}): {}".format(rule.name, owner_num, str(e)),
-                    "WhatsApp Send Error"
+                    "Invalid phone number: {}".format(phone),
+                    "WhatsApp Phone Error"
                 )
+                continue
+
+        rows.append({
+            "phone": phone,
+            "message": message,
+            "reference_doctype": doc.doctype,
+            "reference_name": doc.name,
+            "notification_rule": rule.name,
+            "recipient_name": recipient_name,
+            "formatted_phone": formatted_phone,
+            "scheduled_time": scheduled_time
+        })
+
+    try:
+        log_names = create_message_logs_bulk(rows)
+    except Exception as e:
+        frappe.log_error(
+            "WhatsApp Send Error ({}): {}".format(rule.name, str(e)),
+            "WhatsApp Send Error"
+        )
+        return
+
+    # Determine how to send
+    if scheduled_time:
+        # Scheduled for future - will be picked up by scheduler
+        return
+
+    if settings.get("queue_enabled"):
+        # Queue for background processing (after the logs are committed)
+        for log_name in log_names:
+            enqueue_message_log(log_name)
+    else:
+        # Send immediately (synchronous)
+        process_message_logs(log_names)
 
 
 def is_group_id(recipient):
@@ -321,7 +384,7 @@ def send_notification(phone, message, reference_doctype, reference_name,
         print_format: Print format for PDF generation
         fixed_file_url: URL of fixed file to send (for Fixed File message type)
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log
+    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log, enqueue_message_log
     from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
     from whatsapp_notifications.whatsapp_notifications.api import process_message_log, process_media_message_log
 
@@ -407,12 +470,8 @@ def send_notification(phone, message, reference_doctype, reference_name,
             # Scheduled for future - will be picked up by scheduler
             pass
         elif settings.get("queue_enabled"):
-            # Queue for background processing
-            frappe.enqueue(
-                "whatsapp_notifications.whatsapp_notifications.api.process_message_log",
-                log_name=log.name,
-                queue="short"
-            )
+            # Queue for background processing (after the log is committed)
+            enqueue_message_log(log.name)
         else:
             # Send immediately (synchronous)
             process_message_log(log.name)
@@ -441,7 +500,7 @@ def send_media_notification(phone, formatted_phone, message, reference_doctype,
         use_fixed_file: Whether to send a fixed file
         fixed_file_url: URL of the fixed file to send
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log
+    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_message_log.whatsapp_message_log import create_message_log, enqueue_message_log
     from whatsapp_notifications.whatsapp_notifications.api import (
         process_media_message_log, get_document_pdf, get_file_as_base64
     )
@@ -604,12 +663,8 @@ def send_media_notification(phone, formatted_phone, message, reference_doctype,
             # Scheduled for future - will be picked up by scheduler
             pass
         elif settings.get("queue_enabled"):
-            # Queue for background processing
-            frappe.enqueue(
-                "whatsapp_notifications.whatsapp_notifications.api.process_media_message_log",
-                log_name=log.name,
-                queue="short"
-            )
+            # Queue for background processing (after the log is committed)
+            enqueue_message_log(log.name, "Document")
         else:
             # Send immediately (synchronous)
             process_media_message_log(log.name)
@@ -4,8 +4,18 @@ Phone formatting, validation, and Jinja helpers
 """
 import frappe
 from frappe import _
+import json
 import re
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# requests module and shared Session, both loaded on first use (one per worker process)
+_requests = None
+_http_session = None
+
 
 def format_phone_number(phone, country_code=None, local_length=None, local_prefixes=None):
     """
@@ -49,22 +59,16 @@ def format_phone_number(phone, country_code=None, local_length=None, local_prefi
         local_length = local_length or settings.get("local_number_length", 9)
         local_prefixes = local_prefixes or settings.get("local_number_prefixes", [])
     
-    # Ensure prefixes is a list
+    # Ensure prefixes is a tuple (str.startswith checks them all in one call)
     if isinstance(local_prefixes, str):
-        local_prefixes = [p.strip() for p in local_prefixes.split(",") if p.strip()]
+        local_prefixes = split_prefixes(local_prefixes)
+    elif not isinstance(local_prefixes, tuple):
+        local_prefixes = tuple(local_prefixes)
     
     # Check if it's a local number that needs country code
     if len(phone) == local_length:
-        # Check if starts with valid local prefix
-        is_local = False
-        for prefix in local_prefixes:
-            if phone.startswith(prefix):
-                is_local = True
-                break
-        
         # If no prefixes defined, assume it's local
-        if not local_prefixes:
-            is_local = True
+        is_local = not local_prefixes or phone.startswith(local_prefixes)
         
         if is_local:
             phone = country_code + phone
@@ -77,6 +81,19 @@ def format_phone_number(phone, country_code=None, local_length=None, local_prefi
     return phone
 
 
+def split_prefixes(value):
+    """
+    Parse a comma separated prefix list into a tuple of stripped, non-empty prefixes
+
+    Args:
+        value: e.g. "82, 83,84"
+
+    Returns:
+        tuple: e.g. ("82", "83", "84")
+    """
+    return tuple(p.strip() for p in (value or "").split(",") if p.strip())
+
+
 def validate_phone_number(phone, country_code=None, local_length=None, local_prefixes=None):
     """
     Validate a phone number
@@ -248,6 +265,44 @@ def build_message_from_template(template, doc, extra_context=None):
     return frappe.render_template(template, context)
 
 
+def render_cached_template(template, context):
+    """
+    Render a Jinja2 template string, compiling it only once per request
+
+    Same output as frappe.render_template for plain template strings, but
+    the parsed template is kept on frappe.local by source text, so a
+    template rendered for many documents in one request or job is compiled
+    only the first time. The cache lives and dies with frappe.local, like
+    the Jinja environment (and its globals) the template is bound to.
+    Templates that fail to compile or render are handed to
+    frappe.render_template so its error handling applies.
+
+    Args:
+        template: Jinja2 template string
+        context: Template context dict
+
+    Returns:
+        str: Rendered text
+    """
+    from jinja2 import TemplateError
+
+    cache = getattr(frappe.local, "whatsapp_compiled_templates", None)
+    if cache is None:
+        cache = frappe.local.whatsapp_compiled_templates = {}
+
+    try:
+        compiled = cache.get(template)
+        if compiled is None:
+            # Same guard frappe.render_template applies to template strings
+            if ".__" in template:
+                frappe.throw(_("Illegal template"))
+            compiled = cache[template] = frappe.get_jenv().from_string(template)
+
+        return compiled.render(context)
+    except TemplateError:
+        return frappe.render_template(template, context)
+
+
 # ============================================================
 # Timeline Comment Helpers
 # ============================================================
@@ -281,6 +336,219 @@ def add_whatsapp_comment(doctype, docname, comment_text, comment_type="Info"):
         pass
 
 
+def add_whatsapp_comments(doctype, docname, comment_texts, comment_type="Info"):
+    """
+    Add several WhatsApp timeline comments to a document in one INSERT
+
+    Args:
+        doctype: Document type
+        docname: Document name
+        comment_texts: List of comment contents (HTML supported)
+        comment_type: Comment type (Info, Comment, etc.)
+    """
+    if len(comment_texts) <= 1:
+        for comment_text in comment_texts:
+            add_whatsapp_comment(doctype, docname, comment_text, comment_type)
+        return
+
+    try:
+        # Skip if doctype is a WhatsApp internal doctype
+        if doctype in ("WhatsApp Message Log", "WhatsApp Approval Request",
+                       "WhatsApp Approval Template", "Evolution API Settings"):
+            return
+
+        now = frappe.utils.now_datetime()
+        user = frappe.session.user
+
+        frappe.db.bulk_insert(
+            "Comment",
+            fields=[
+                "name", "creation", "modified", "owner", "modified_by", "docstatus",
+                "comment_type", "comment_email", "reference_doctype", "reference_name", "content"
+            ],
+            values=[
+                (
+                    frappe.generate_hash(length=10), now, now, user, user, 0,
+                    comment_type, user, doctype, docname, comment_text
+                )
+                for comment_text in comment_texts
+            ]
+        )
+
+    except Exception:
+        # Don't let comment errors break the main flow
+        pass
+
+
+def reserve_series_names(prefix, count, digits=5):
+    """
+    Reserve consecutive names from a naming series with one tabSeries update
+
+    Args:
+        prefix: Series prefix (e.g. "WAMSG-")
+        count: Number of names to reserve
+        digits: Zero-padded counter width
+
+    Returns:
+        list: Names such as WAMSG-00042
+    """
+    current = frappe.db.sql(
+        "SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE", (prefix,)
+    )
+
+    if current and current[0][0] is not None:
+        start = frappe.utils.cint(current[0][0])
+        frappe.db.sql(
+            "UPDATE `tabSeries` SET `current` = `current` + %s WHERE `name` = %s", (count, prefix)
+        )
+    else:
+        start = 0
+        frappe.db.sql(
+            "INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (prefix, count)
+        )
+
+    return ["{}{}".format(prefix, str(start + i).zfill(digits)) for i in range(1, count + 1)]
+
+
+def log_debug(message, title):
+    """
+    Buffer a debug trace for the current request/job instead of inserting an
+    Error Log row straight away. Flushed in one INSERT by flush_debug_log.
+
+    Args:
+        message: Debug message
+        title: Error Log title
+    """
+    if not hasattr(frappe.local, "wa_debug_buffer"):
+        frappe.local.wa_debug_buffer = []
+
+    frappe.local.wa_debug_buffer.append((title, message))
+
+
+def flush_debug_log(*args, **kwargs):
+    """
+    Write buffered debug traces as Error Log rows with a single INSERT
+    Registered as after_request / after_job hook; also safe to call directly
+    """
+    buffer = getattr(frappe.local, "wa_debug_buffer", None)
+    if not buffer:
+        return
+
+    frappe.local.wa_debug_buffer = []
+
+    try:
+        now = frappe.utils.now_datetime()
+        user = frappe.session.user if getattr(frappe.local, "session", None) else "Administrator"
+
+        frappe.db.bulk_insert(
+            "Error Log",
+            fields=["name", "creation", "modified", "owner", "modified_by", "docstatus", "method", "error"],
+            values=[
+                (frappe.generate_hash(length=10), now, now, user, user, 0, title, message)
+                for title, message in buffer
+            ]
+        )
+        frappe.db.commit()
+
+    except Exception:
+        # Debug output must never break the main flow
+        pass
+
+
+def get_requests():
+    """
+    Get the requests module, imported the first time it is needed
+
+    Returns:
+        module: requests
+    """
+    global _requests
+
+    if _requests is None:
+        import requests
+        _requests = requests
+
+    return _requests
+
+
+def get_http_session():
+    """
+    Get the shared requests.Session used for Evolution API calls
+
+    Keeps connections to the API alive between calls instead of paying a
+    new TCP/TLS handshake per message. Idempotent requests (GET) are retried
+    on connection errors and 502/503/504; POSTs are never resent.
+
+    Returns:
+        requests.Session
+    """
+    global _http_session
+
+    if _http_session is None:
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        session = get_requests().Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_session = session
+
+    return _http_session
+
+
+def prepare_json_body(headers, data):
+    """
+    Encode a dict/list payload as UTF-8 JSON once for an HTTP call
+
+    Uses orjson when it is installed. The caller's headers dict is never
+    mutated; a copy is returned with the JSON Content-Type set.
+
+    Args:
+        headers: Request headers (or None)
+        data: Payload; dicts and lists are encoded, anything else is passed through
+
+    Returns:
+        tuple: (headers, body)
+    """
+    headers = dict(headers or {})
+
+    if not isinstance(data, (dict, list)):
+        return headers, data
+
+    headers["Content-Type"] = "application/json; charset=utf-8"
+
+    if orjson is not None:
+        try:
+            return headers, orjson.dumps(data)
+        except TypeError:
+            pass  # e.g. non-string keys; let json handle it
+
+    return headers, json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def loads_json(value):
+    """
+    Parse a JSON string, with orjson when it is installed
+
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can
+    catch the stdlib exception either way.
+
+    Args:
+        value: JSON text (str or bytes)
+
+    Returns:
+        Parsed value
+    """
+    if orjson is not None:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
 def format_phone_for_display(phone):
     """
     Format phone number for display in comments
@@ -333,29 +601,42 @@ def add_notification_sent_comment(doctype, docname, phone, recipient_name=None):
     add_whatsapp_comment(doctype, docname, comment)
 
 
-def add_approval_sent_comment(doctype, docname, phone, template_name, recipient_name=None):
+def get_approval_sent_comment(phone, template_name, recipient_name=None):
     """
-    Add timeline comment for approval request sent
+    Build the timeline comment text for an approval request sent
 
     Args:
-        doctype: Document type
-        docname: Document name
         phone: Recipient phone number
         template_name: Approval template name
         recipient_name: Recipient name (optional)
+
+    Returns:
+        str: Comment content
     """
     formatted_phone = format_phone_for_display(phone)
 
     if recipient_name:
-        comment = "📱 <strong>WhatsApp:</strong> Pedido de aprovação enviado para {} ({}) - Template: {}".format(
+        return "📱 <strong>WhatsApp:</strong> Pedido de aprovação enviado para {} ({}) - Template: {}".format(
             recipient_name, formatted_phone, template_name
         )
-    else:
-        comment = "📱 <strong>WhatsApp:</strong> Pedido de aprovação enviado para {} - Template: {}".format(
-            formatted_phone, template_name
-        )
 
-    add_whatsapp_comment(doctype, docname, comment)
+    return "📱 <strong>WhatsApp:</strong> Pedido de aprovação enviado para {} - Template: {}".format(
+        formatted_phone, template_name
+    )
+
+
+def add_approval_sent_comment(doctype, docname, phone, template_name, recipient_name=None):
+    """
+    Add timeline comment for approval request sent
+
+    Args:
+        doctype: Document type
+        docname: Document name
+        phone: Recipient phone number
+        template_name: Approval template name
+        recipient_name: Recipient name (optional)
+    """
+    add_whatsapp_comment(doctype, docname, get_approval_sent_comment(phone, template_name, recipient_name))
 
 
 def add_approval_response_comment(doctype, docname, phone, option_label, status):
@@ -7,6 +7,16 @@ from frappe import _
 import json
 import re
 
+from whatsapp_notifications.whatsapp_notifications.api import send_whatsapp_notification
+from whatsapp_notifications.whatsapp_notifications.approval import process_approval_response
+from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
+from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_approval_request.whatsapp_approval_request import (
+    PENDING_REQUEST_FIELDS,
+    get_option_from_snapshot,
+    get_pending_request_by_phone,
+)
+from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
+
 
 @frappe.whitelist(allow_guest=True)
 def receive_message():
@@ -34,8 +44,6 @@ def receive_message():
         }
     }
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.evolution_api_settings.evolution_api_settings import get_settings
-
     try:
         settings = get_settings()
 
@@ -237,9 +245,6 @@ def process_potential_approval_response(sender_phone, message_text, settings):
     Returns:
         dict: Result with processed flag
     """
-    from whatsapp_notifications.whatsapp_notifications.utils import format_phone_number
-    from whatsapp_notifications.whatsapp_notifications.approval import process_approval_response
-
     # Format the sender phone for matching
     formatted_phone = format_phone_number(sender_phone)
 
@@ -263,9 +268,6 @@ def process_potential_approval_response(sender_phone, message_text, settings):
     # Parse the response to get option number
     option_number = parse_response_option(message_text)
 
-    # Get the template
-    template = frappe.get_doc("WhatsApp Approval Template", approval_request.approval_template)
-
     if option_number is None:
         # Invalid response - send help message using template's custom message
         if settings.get("enable_debug_logging"):
@@ -277,15 +279,19 @@ def process_potential_approval_response(sender_phone, message_text, settings):
             )
 
         # Send help message (uses template's custom message if configured)
+        template = frappe.get_cached_doc("WhatsApp Approval Template", approval_request.approval_template)
         send_invalid_response_message(approval_request, template, message_text, settings)
 
         return {"processed": False, "reason": "Invalid option number"}
 
-    # Validate option number exists in template
-    option = template.get_option_by_number(option_number)
+    # Validate option number against the options captured when the request was sent
+    option = get_option_from_snapshot(
+        approval_request.options_snapshot, option_number, approval_request.approval_template
+    )
 
     if not option:
         # Option number not valid for this template
+        template = frappe.get_cached_doc("WhatsApp Approval Template", approval_request.approval_template)
         send_invalid_response_message(approval_request, template, message_text, settings)
         return {"processed": False, "reason": "Option {} not valid for this approval".format(option_number)}
 
@@ -323,10 +329,8 @@ def find_pending_approval_for_phone(formatted_phone, original_phone):
         original_phone: Original phone number from webhook
 
     Returns:
-        WhatsApp Approval Request or None
+        frappe._dict with PENDING_REQUEST_FIELDS or None
     """
-    from whatsapp_notifications.whatsapp_notifications.doctype.whatsapp_approval_request.whatsapp_approval_request import get_pending_request_by_phone
-
     # Try formatted phone first
     request = get_pending_request_by_phone(formatted_phone)
     if request:
@@ -350,12 +354,13 @@ def find_pending_approval_for_phone(formatted_phone, original_phone):
                 "status": "Pending",
                 "formatted_phone": ["like", "%{}".format(suffix)]
             },
+            fields=PENDING_REQUEST_FIELDS,
             order_by="creation desc",
             limit=1
         )
 
         if requests:
-            return frappe.get_doc("WhatsApp Approval Request", requests[0].name)
+            return requests[0]
 
     return None
 
@@ -452,8 +457,6 @@ def send_already_processed_message(approval_request, settings):
         approval_request: WhatsApp Approval Request
         settings: Evolution API settings
     """
-    from whatsapp_notifications.whatsapp_notifications.api import send_whatsapp_notification
-
     try:
         message = _("This approval request has already been processed.\n\nStatus: {0}").format(
             approval_request.status
@@ -491,8 +494,6 @@ def send_invalid_response_message(approval_request, template, received_text, set
         received_text: The invalid text received
         settings: Evolution API settings
     """
-    from whatsapp_notifications.whatsapp_notifications.api import send_whatsapp_notification
-
     try:
         # Use template's custom invalid response message if configured
         message = template.render_invalid_response_message(received_text)